@@ -0,0 +1,210 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from rendering import calculate_order_price_and_profit
+
+# Helper function to parse an order timestamp into a naive datetime
+def parse_order_date(created_at: str) -> datetime:
+    return datetime.fromisoformat(created_at.replace('Z', '+00:00')).replace(tzinfo=None)
+
+# Helper function to count orders by status, product and customer
+def calculate_statistics(orders) -> dict:
+    stats = {
+        'total': len(orders),
+        'approved': 0,
+        'rejected': 0,
+        'pending': 0,
+        'total_quantity': 0,
+        'products': defaultdict(int),
+        'customers': defaultdict(int)  # Track customer orders
+    }
+
+    for order in orders:
+        stats[order.status] += 1
+        stats['total_quantity'] += order.quantity
+        stats['products'][order.product] += order.quantity
+        stats['customers'][order.phone] += 1
+
+    return stats
+
+# Helper function to aggregate quantity, revenue and profit of approved orders per product
+def calculate_product_stats(orders) -> dict:
+    product_stats = defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
+    for order in orders:
+        if order.status == 'approved':
+            price, profit = calculate_order_price_and_profit(order.product, order.quantity)
+            product_stats[order.product]['quantity'] += order.quantity
+            product_stats[order.product]['revenue'] += price
+            product_stats[order.product]['profit'] += profit
+    return product_stats
+
+# Helper function to aggregate revenue and profit of approved orders per day and product
+def calculate_finance_summary(orders, today: date = None) -> dict:
+    quantities = defaultdict(int)
+    for order in orders:
+        if order.status == 'approved':
+            quantities[(parse_order_date(order.created_at).strftime('%Y-%m-%d'), order.product)] += order.quantity
+    rows = (
+        (day, product, quantity) + calculate_order_price_and_profit(product, quantity)
+        for (day, product), quantity in quantities.items()
+    )
+    return summarize_finance_days(rows, today)
+
+# Helper function to build the finance summary from (day, product, quantity, revenue, profit) rows
+def summarize_finance_days(rows, today: date = None) -> dict:
+    today = today or date.today()
+    week_start = (today - timedelta(days=6)).isoformat()
+    month_30_start = (today - timedelta(days=29)).isoformat()
+    month_start = today.replace(day=1)
+    previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+    # The previous month up to the same day of the month, for a like-for-like comparison
+    previous_month_end = min(previous_month_start + (today - month_start), month_start - timedelta(days=1))
+    month_start, previous_month_start, previous_month_end = (
+        month_start.isoformat(), previous_month_start.isoformat(), previous_month_end.isoformat()
+    )
+
+    summary = {
+        'total_revenue': 0,
+        'total_profit': 0,
+        'days': 0,                        # Days with approved orders
+        'daily_revenue': defaultdict(int),  # Last 7 days only
+        'daily_profit': defaultdict(int),
+        'last_30_days': {'revenue': 0, 'profit': 0},
+        'month': {'revenue': 0, 'profit': 0},
+        'previous_month': {'revenue': 0, 'profit': 0},
+        'product_stats': defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
+    }
+    days = set()
+    for day, product, quantity, revenue, profit in rows:
+        days.add(day)
+        summary['total_revenue'] += revenue
+        summary['total_profit'] += profit
+        summary['product_stats'][product]['quantity'] += quantity
+        summary['product_stats'][product]['revenue'] += revenue
+        summary['product_stats'][product]['profit'] += profit
+        if day >= week_start:
+            summary['daily_revenue'][day] += revenue
+            summary['daily_profit'][day] += profit
+        buckets = []
+        if day >= month_30_start:
+            buckets.append('last_30_days')
+        if day >= month_start:
+            buckets.append('month')
+        elif previous_month_start <= day <= previous_month_end:
+            buckets.append('previous_month')
+        for bucket in buckets:
+            summary[bucket]['revenue'] += revenue
+            summary[bucket]['profit'] += profit
+    summary['days'] = len(days)
+    return summary
+
+# Helper function to get the [start, end] range of a period menu entry
+def period_bounds(period: str, now: datetime = None) -> tuple:
+    now = now or datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "today":
+        return midnight, now
+    if period == "yesterday":
+        return midnight - timedelta(days=1), midnight
+    if period == "week":
+        return now - timedelta(days=7), now
+    if period == "month":
+        return now - timedelta(days=30), now
+    raise ValueError(f"Unknown period: {period}")
+
+# Helper function to keep orders created within a period
+def filter_orders_by_period(orders, period: str, now: datetime = None) -> list:
+    start_date, end_date = period_bounds(period, now)
+    return [order for order in orders if start_date <= parse_order_date(order.created_at) <= end_date]
+
+# Helper function to summarize orders of a period
+def calculate_period_summary(orders) -> dict:
+    product_stats = calculate_product_stats(orders)
+    return {
+        'total_orders': len(orders),
+        'total_quantity': sum(order.quantity for order in orders),
+        'total_revenue': sum(stats['revenue'] for stats in product_stats.values()),
+        'total_profit': sum(stats['profit'] for stats in product_stats.values()),
+        'product_stats': product_stats
+    }
+
+def _format_product_block(product_stats, with_average: bool = False) -> str:
+    text = ""
+    for product, stats in product_stats:
+        text += (
+            f"📦 {product}:\n"
+            f"   • Количество: {stats['quantity']} шт.\n"
+            f"   • Выручка: {stats['revenue']:,.0f} сум\n"
+            f"   • Прибыль: {stats['profit']:,.0f} сум\n"
+        )
+        if with_average:
+            text += f"   • Средняя цена: {stats['revenue']/stats['quantity']:,.0f} сум\n"
+        text += "\n"
+    return text
+
+def _change(current: float, previous: float) -> str:
+    if not previous:
+        return "—"
+    return f"{(current - previous) / previous * 100:+.0f}%"
+
+# Text of the financial summary view
+def format_finance_summary(summary: dict) -> str:
+    daily_revenue = summary['daily_revenue']
+    daily_profit = summary['daily_profit']
+
+    # Calculate average daily revenue and profit
+    avg_daily_revenue = summary['total_revenue'] / summary['days'] if summary['days'] else 0
+    avg_daily_profit = summary['total_profit'] / summary['days'] if summary['days'] else 0
+    month, previous_month = summary['month'], summary['previous_month']
+
+    text = (
+        "💰 Финансовая сводка:\n\n"
+        f"📈 Общая выручка: {summary['total_revenue']:,.0f} сум\n"
+        f"💵 Общая прибыль: {summary['total_profit']:,.0f} сум\n"
+        f"📊 Средняя дневная выручка: {avg_daily_revenue:,.0f} сум\n"
+        f"📊 Средняя дневная прибыль: {avg_daily_profit:,.0f} сум\n\n"
+        f"🗓 За 30 дней: 💰 {summary['last_30_days']['revenue']:,.0f} сум | 💵 {summary['last_30_days']['profit']:,.0f} сум\n"
+        f"🗓 Этот месяц: 💰 {month['revenue']:,.0f} сум ({_change(month['revenue'], previous_month['revenue'])}) | "
+        f"💵 {month['profit']:,.0f} сум ({_change(month['profit'], previous_month['profit'])})\n"
+        f"🗓 Прошлый месяц, те же дни: 💰 {previous_month['revenue']:,.0f} сум | 💵 {previous_month['profit']:,.0f} сум\n\n"
+        "📈 Статистика по товарам:\n"
+    )
+    text += _format_product_block(summary['product_stats'].items())
+
+    # Show last 7 days
+    text += "📅 Последние 7 дней:\n"
+    for day, revenue in sorted(daily_revenue.items(), reverse=True):
+        text += (
+            f"📅 {day}: "
+            f"💰 {revenue:,.0f} сум | "
+            f"💵 {daily_profit[day]:,.0f} сум\n"
+        )
+    return text
+
+# Text of the top products view
+def format_product_stats(product_stats: dict) -> str:
+    sorted_products = sorted(product_stats.items(), key=lambda x: x[1]['quantity'], reverse=True)
+    return "📈 Топ товаров:\n\n" + _format_product_block(sorted_products, with_average=True)
+
+# Text of the period view
+def format_period_summary(period: str, summary: dict, orders) -> str:
+    text = (
+        f"📊 Статистика за {period}:\n\n"
+        f"📦 Всего заказов: {summary['total_orders']}\n"
+        f"📦 Всего товаров: {summary['total_quantity']}\n"
+        f"💰 Выручка: {summary['total_revenue']:,.0f} сум\n"
+        f"💵 Прибыль: {summary['total_profit']:,.0f} сум\n\n"
+        "📈 Статистика по товарам:\n"
+    )
+    text += _format_product_block(summary['product_stats'].items())
+
+    # Show last 5 orders
+    text += "📋 Последние заказы:\n"
+    for order in orders[-5:]:
+        price, profit = calculate_order_price_and_profit(order.product, order.quantity)
+        text += (
+            f"🆔 {order.id} | "
+            f"📦 {order.product} x{order.quantity} | "
+            f"💰 {price:,.0f} сум | "
+            f"📝 {order.status}\n"
+        )
+    return text
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from config import (
+    BACKEND_URL, MEDIA_URL, BACKEND_TIMEOUTS, BACKEND_MAX_RETRIES, BACKEND_RETRY_BACKOFF,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, BACKEND_HEDGE_DELAY, EXECUTOR_WORKERS
+)
+from models import loads, decode_orders, decode_order
+from metrics import BACKEND_LATENCY, BACKEND_RESPONSES, RECEIPT_FETCH_SECONDS, RECEIPT_FETCH_BYTES
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD'}
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+SNAPSHOT_CACHE_SIZE = 256  # Stale fallbacks kept: the order lists plus recently opened orders
+
+# Raised instead of calling the backend while the circuit is open
+class CircuitOpenError(requests.RequestException):
+    pass
+
+# Tracks backend health and short-circuits calls while it is down
+class CircuitBreaker:
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None  # The single probe let through while half-open
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def is_open(self) -> bool:
+        return self.state == 'open'
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state != 'half_open':
+                return state == 'closed'
+            # One trial request at a time; a probe that never reported back is replaced after reset_timeout
+            now = time.monotonic()
+            if self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Backend recovered, closing circuit")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f"Backend failing ({self.failures} errors), opening circuit for {self.reset_timeout}s")
+                self.opened_at = time.monotonic()
+                self.trial_started_at = None
+
+# Backend access with timeouts, retries, circuit breaking and stale fallbacks
+class BackendClient:
+    def __init__(self, base_url=BACKEND_URL, media_url=MEDIA_URL, hedge_delay=BACKEND_HEDGE_DELAY):
+        self.base_url = base_url
+        self.media_url = media_url
+        self.hedge_delay = hedge_delay
+        self.circuit = CircuitBreaker()
+        self.session = requests.Session()
+        # One pooled connection per executor thread, so concurrent calls do not open and drop extra ones
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=EXECUTOR_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._snapshots = OrderedDict()  # Last good JSON payload per URL, served while the backend is down
+        self._snapshots_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="backend-hedge")
+
+    def _send(self, method, url, endpoint, **kwargs) -> requests.Response:
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=BACKEND_TIMEOUTS[endpoint], **kwargs)
+        except requests.RequestException:
+            BACKEND_RESPONSES.inc(endpoint=endpoint, code="error")
+            raise
+        finally:
+            BACKEND_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, method=method)
+        BACKEND_RESPONSES.inc(endpoint=endpoint, code=response.status_code)
+        if response.status_code >= 500:
+            # Treat server errors as failures so they count against the circuit
+            response.raise_for_status()
+        return response
+
+    def _send_hedged(self, method, url, endpoint, **kwargs) -> requests.Response:
+        # Fire a second identical GET if the first is slower than hedge_delay, keep the winner
+        futures = [self._hedge_pool.submit(self._send, method, url, endpoint, **kwargs)]
+        done, _ = wait(futures, timeout=self.hedge_delay)
+        if not done:
+            futures.append(self._hedge_pool.submit(self._send, method, url, endpoint, **kwargs))
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except requests.RequestException as e:
+                    error = e
+        raise error
+
+    def request(self, method, url, endpoint, **kwargs) -> requests.Response:
+        if not self.circuit.allow_request():
+            raise CircuitOpenError(f"Backend circuit is open, skipping {method} {url}")
+
+        retries = BACKEND_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+        hedge = self.hedge_delay > 0 and method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                if hedge:
+                    response = self._send_hedged(method, url, endpoint, **kwargs)
+                else:
+                    response = self._send(method, url, endpoint, **kwargs)
+                self.circuit.record_success()
+                response.raise_for_status()
+                return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.circuit.record_failure()
+                error = e
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code < 500:
+                    # Client errors (404 etc.) say nothing about backend health
+                    raise
+                self.circuit.record_failure()
+                if e.response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise
+                error = e
+
+            if attempt >= retries or not self.circuit.allow_request():
+                raise error
+            attempt += 1
+            delay = BACKEND_RETRY_BACKOFF * 2 ** (attempt - 1)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            logger.warning(f"{method} {url} failed ({error}), retry {attempt}/{retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def get_json(self, url, endpoint, allow_stale=True, decode=loads):
+        try:
+            data = decode(self.request('GET', url, endpoint).content)
+        except (requests.ConnectionError, requests.Timeout, CircuitOpenError) as e:
+            if allow_stale and url in self._snapshots:
+                logger.warning(f"Serving stale data for {url}: {e}")
+                return self._snapshots[url]
+            raise
+        except requests.HTTPError as e:
+            if allow_stale and e.response is not None and e.response.status_code >= 500 and url in self._snapshots:
+                logger.warning(f"Serving stale data for {url}: {e}")
+                return self._snapshots[url]
+            raise
+        with self._snapshots_lock:
+            self._snapshots[url] = data
+            self._snapshots.move_to_end(url)
+            if len(self._snapshots) > SNAPSHOT_CACHE_SIZE:
+                self._snapshots.popitem(last=False)
+        return data
+
+    def receipt_url(self, receipt: str) -> str:
+        return receipt if receipt.startswith('http') else f"{self.media_url}{receipt}"
+
+    # Async API used by handlers: blocking I/O runs in a worker thread
+    async def get_orders(self, status: str = None, allow_stale: bool = True):
+        url = f"{self.base_url}?status={status}" if status else self.base_url
+        return await asyncio.to_thread(self.get_json, url, 'list', allow_stale, decode_orders)
+
+    async def get_order(self, order_id, allow_stale: bool = True):
+        return await asyncio.to_thread(self.get_json, f"{self.base_url}{order_id}/", 'detail', allow_stale, decode_order)
+
+    async def update_status(self, order_id, status: str, idempotency_key: str = None):
+        # Sent once here: status_updates retries the whole call with the same key, so the backend can drop duplicates
+        headers = {'Content-Type': 'application/json'}
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+        response = await asyncio.to_thread(
+            self.request, 'PATCH', f"{self.base_url}{order_id}/", 'update',
+            json={'status': status},
+            headers=headers
+        )
+        return loads(response.content) if response.content else None
+
+    async def fetch_receipt(self, receipt: str) -> bytes:
+        started = time.perf_counter()
+        response = await asyncio.to_thread(self.request, 'GET', self.receipt_url(receipt), 'receipt')
+        RECEIPT_FETCH_SECONDS.observe(time.perf_counter() - started)
+        RECEIPT_FETCH_BYTES.observe(len(response.content))
+        return response.content
+
+backend = BackendClient()
@@ -0,0 +1,124 @@
+import pytest
+from models import decode_orders, loads
+from analytics import (
+    calculate_statistics, calculate_finance_summary, calculate_product_stats,
+    filter_orders_by_period, calculate_period_summary, format_finance_summary
+)
+
+def test_decode_orders(benchmark, orders_json, orders):
+    decoded = benchmark(decode_orders, orders_json)
+    assert len(decoded) == len(orders)
+
+# Baseline for test_decode_orders: plain dicts, as response.json() returned them
+def test_decode_dicts(benchmark, orders_json):
+    benchmark(loads, orders_json)
+
+def test_calculate_statistics(benchmark, orders):
+    stats = benchmark(calculate_statistics, orders)
+    assert stats['total'] == len(orders)
+
+def test_finance_summary(benchmark, orders):
+    summary = benchmark(lambda: format_finance_summary(calculate_finance_summary(orders)))
+    assert "Финансовая сводка" in summary
+
+def test_product_stats(benchmark, orders):
+    product_stats = benchmark(calculate_product_stats, orders)
+    assert product_stats
+
+@pytest.mark.parametrize("period", ["today", "week", "month"])
+def test_period_summary(benchmark, orders, period):
+    benchmark(lambda: calculate_period_summary(filter_orders_by_period(orders, period)))
+
+# Same views answered by the local SQLite mirror
+def test_mirror_statistics(benchmark, order_store, orders):
+    stats = benchmark(order_store.statistics)
+    assert stats['total'] == len(orders)
+
+def test_mirror_finance_summary(benchmark, order_store):
+    benchmark(lambda: format_finance_summary(order_store.finance_summary()))
+
+@pytest.mark.parametrize("period", ["today", "week", "month"])
+def test_mirror_period_summary(benchmark, order_store, period):
+    benchmark(lambda: calculate_period_summary(order_store.period_orders(period)))
+
+# The /stats handler path: served from the local mirror, which only syncs once per MIRROR_FULL_SYNC_INTERVAL
+def test_get_statistics_from_mirror(benchmark, fake_backend, run):
+    from handlers import get_statistics
+    from order_store import order_store
+    run(order_store.sync_full())  # The mirror may still hold another scale's dataset
+    stats = benchmark(lambda: run(get_statistics()))
+    assert stats['total'] == len(fake_backend.orders)
+
+# End to end through the fake backend on every round: full mirror sync (HTTP fetch, JSON decoding, upsert) and aggregation
+def test_get_statistics_with_sync(benchmark, fake_backend, run):
+    from handlers import get_statistics
+    from order_store import order_store
+
+    async def sync_and_read():
+        await order_store.sync_full()
+        return await get_statistics()
+
+    stats = benchmark.pedantic(lambda: run(sync_and_read()), rounds=3, iterations=1)
+    assert stats['total'] == len(fake_backend.orders)
+
+def test_generate_excel_file(benchmark, fake_backend, run, scale):
+    if scale not in ('1k', '10k'):
+        pytest.skip("Excel export is only timed up to 10k orders")
+    from handlers import generate_excel_file
+    excel = benchmark.pedantic(lambda: run(generate_excel_file()), rounds=3, iterations=1)
+    assert excel.getbuffer().nbytes
+
+# One order_checker tick announcing every pending order to an empty dedup set
+def test_check_new_orders_tick(benchmark, fake_backend, run, bot, tmp_path):
+    import handlers
+    from leader import NotificationLog
+    from order_checker import check_new_orders
+
+    class Lease:
+        is_leader = True
+
+    def setup():
+        # Otherwise send_order_to_admin skips every order after the first round
+        handlers.sent_order_ids.clear()
+        return (set(),), {}
+
+    notified = NotificationLog(str(tmp_path / "state.db"))
+    sent = benchmark.pedantic(
+        lambda sent_orders: run(check_new_orders(bot, sent_orders, notified, Lease())),
+        setup=setup,
+        rounds=3, iterations=1
+    )
+    assert sent == sum(1 for order in fake_backend.orders.values() if order['status'] == 'pending')
+
+# The same tick during a burst: pending orders go out as digests with receipt albums
+def test_check_new_orders_digest_tick(benchmark, fake_backend, run, bot, tmp_path):
+    import handlers
+    from leader import NotificationLog
+    from order_checker import NotificationCoalescer, check_new_orders
+
+    class Lease:
+        is_leader = True
+
+    def setup():
+        handlers.sent_order_ids.clear()
+        return (set(), NotificationCoalescer(threshold=0)), {}
+
+    notified = NotificationLog(str(tmp_path / "state.db"))
+    sent = benchmark.pedantic(
+        lambda sent_orders, coalescer: run(check_new_orders(bot, sent_orders, notified, Lease(), coalescer)),
+        setup=setup,
+        rounds=3, iterations=1
+    )
+    assert sent == sum(1 for order in fake_backend.orders.values() if order['status'] == 'pending')
+
+@pytest.fixture(scope="module")
+def callback_router():
+    # Importing handlers registers the callback handlers on the router
+    import handlers
+    return handlers.callback_router
+
+# Resolving callback data to its handler and validated payload, as done for every button press
+@pytest.mark.parametrize("data", ["menu:stats", "car:pending:42", "cact:approve:pending:3:1234", "approve_1234"])
+def test_resolve_callback(benchmark, callback_router, data):
+    handler, callback_data = benchmark(callback_router.resolve, data)
+    assert handler is not None and callback_data is not None
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import subprocess
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Peak RSS (KB) of the child process that imports the bot, i.e. everything loaded before start_polling
+IMPORT_BOT = "import resource, bot; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+def _import_bot() -> int:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_BOT], cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    return int(result.stdout.split()[-1])
+
+def test_cold_start(benchmark):
+    rss_kb = benchmark.pedantic(_import_bot, rounds=5, iterations=1)
+    benchmark.extra_info['rss_mb'] = round(rss_kb / 1024, 1)
+    # The reporting stack must not be part of the startup path
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, bot; print('pandas' in sys.modules)"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
+
+# Task churn on a fresh loop: what the dispatcher does per update (tasks, callbacks, to_thread hops)
+async def _loop_workload(tasks: int = 2000):
+    async def update():
+        await asyncio.sleep(0)
+        return await asyncio.to_thread(int, "1")
+    await asyncio.gather(*(update() for _ in range(tasks)))
+
+@pytest.mark.parametrize("use_uvloop", [False, True], ids=["asyncio", "uvloop"])
+def test_event_loop_workload(benchmark, use_uvloop):
+    import runtime
+    if use_uvloop and runtime.uvloop is None:
+        pytest.skip("uvloop is not installed")
+
+    async def main():
+        runtime.configure_executor()
+        benchmark.extra_info['loop'] = runtime.loop_name()
+        await _loop_workload()
+
+    benchmark.pedantic(lambda: runtime.run(main(), use_uvloop=use_uvloop), rounds=5, iterations=1)
+
+def test_session_setup():
+    from config import TELEGRAM_CONNECTION_LIMIT, TELEGRAM_DNS_CACHE_TTL, TELEGRAM_KEEPALIVE_TIMEOUT
+    from runtime import create_session
+
+    async def connect():
+        session = create_session()
+        client = await session.create_session()
+        try:
+            return client.connector.limit, session.dns_cache_ttl, session.keepalive_timeout
+        finally:
+            await session.close()
+
+    assert asyncio.run(connect()) == (TELEGRAM_CONNECTION_LIMIT, TELEGRAM_DNS_CACHE_TTL, TELEGRAM_KEEPALIVE_TIMEOUT)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+import pytest
+import sandbox
+
+_state_dir = sandbox.prepare("gul_bot_bench_")
+
+from fake_backend import FakeBackend
+from synthetic import generate_scale
+from models import Order
+
+# Dataset sizes to run, e.g. BENCH_SCALES=1k,10k,100k,1m (1m is opt-in: it takes minutes)
+BENCH_SCALES = [scale.strip() for scale in os.getenv("BENCH_SCALES", "1k,10k").split(",") if scale.strip()]
+# Simulated backend latency in seconds for benchmarks going through the fake backend
+BENCH_BACKEND_LATENCY = float(os.getenv("BENCH_BACKEND_LATENCY", "0"))
+
+_datasets = {}
+
+def dataset(scale: str) -> list:
+    if scale not in _datasets:
+        _datasets[scale] = generate_scale(scale)
+    return _datasets[scale]
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        metafunc.parametrize("scale", BENCH_SCALES, scope="session")
+
+@pytest.fixture(scope="session")
+def orders(scale):
+    return [Order.from_dict(order) for order in dataset(scale)]
+
+@pytest.fixture(scope="session")
+def orders_json(scale):
+    # Raw /api/orders/ response body
+    return json.dumps(dataset(scale), ensure_ascii=False).encode()
+
+@pytest.fixture(scope="session")
+def order_store(orders, scale):
+    from order_store import OrderStore
+    store = OrderStore(os.path.join(_state_dir, f"mirror_{scale}.db"))
+    store.upsert(orders, full=True)
+    return store
+
+@pytest.fixture(scope="session")
+def fake_backend(scale):
+    fake = FakeBackend(dataset(scale), latency=BENCH_BACKEND_LATENCY)
+    url = fake.start()
+    from backend import backend
+    original = backend.base_url, backend.media_url
+    backend.base_url, backend.media_url = f"{url}/api/orders/", url
+    yield fake
+    backend.base_url, backend.media_url = original
+    fake.stop()
+
+@pytest.fixture(scope="session")
+def run():
+    # Runs a coroutine to completion on a dedicated event loop
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+# Records Telegram calls instead of sending them
+class StubBot:
+    def __init__(self):
+        self.calls = []
+
+    def _message(self, chat_id, photo: bool = False):
+        # Just enough of a Message for the notification fan-out to track
+        return SimpleNamespace(
+            chat=SimpleNamespace(id=chat_id), message_id=len(self.calls),
+            photo=[SimpleNamespace(file_id=f"photo{len(self.calls)}")] if photo else None
+        )
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self.calls.append(('send_photo', chat_id))
+        return self._message(chat_id, photo=True)
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        self.calls.append(('send_media_group', chat_id))
+        return [self._message(chat_id, photo=True) for _ in media]
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(('send_message', chat_id))
+        return self._message(chat_id)
+
+@pytest.fixture
+def bot():
+    return StubBot()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import random
+import threading
+from aiohttp import web
+
+# 1x1 JPEG padded to a typical receipt photo size
+RECEIPT_BYTES = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912130f"
+) + b"\0" * 150_000 + bytes.fromhex("ffd9")
+
+# Local stand-in for the orders API and the media host
+class FakeBackend:
+    def __init__(self, orders: list, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 1):
+        self.orders = {str(order['id']): order for order in orders}
+        self.latency = latency            # Base delay per request, seconds
+        self.jitter = jitter              # Extra uniform random delay, seconds
+        self.failure_rate = failure_rate  # Share of requests answered with 503
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self._payloads = {}  # Pre-serialized list responses per status filter
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self.url = None
+
+    def _list_payload(self, status):
+        if status not in self._payloads:
+            orders = [order for order in self.orders.values() if status is None or order['status'] == status]
+            self._payloads[status] = json.dumps(orders, ensure_ascii=False).encode()
+        return self._payloads[status]
+
+    async def _delay(self):
+        self.requests += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            raise web.HTTPServiceUnavailable()
+
+    async def _list(self, request):
+        await self._delay()
+        body = self._list_payload(request.query.get('status'))
+        return web.Response(body=body, content_type="application/json")
+
+    async def _detail(self, request):
+        await self._delay()
+        order = self.orders.get(request.match_info['order_id'])
+        if order is None:
+            raise web.HTTPNotFound()
+        return web.json_response(order)
+
+    async def _update(self, request):
+        await self._delay()
+        order = self.orders.get(request.match_info['order_id'])
+        if order is None:
+            raise web.HTTPNotFound()
+        order.update(await request.json())
+        self._payloads.clear()
+        return web.json_response(order)
+
+    async def _media(self, request):
+        await self._delay()
+        return web.Response(body=RECEIPT_BYTES, content_type="image/jpeg")
+
+    def _app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/orders/", self._list)
+        app.router.add_get("/api/orders/{order_id}/", self._detail)
+        app.router.add_patch("/api/orders/{order_id}/", self._update)
+        app.router.add_get("/media/{path:.*}", self._media)
+        return app
+
+    async def _start(self, host, port):
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}"
+
+    # Serves from a background thread so blocking clients can call it; returns the base URL
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._start(host, port))
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-backend", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/fake_backend.py 10k 8000
+    import sys
+    import time
+    from synthetic import generate_scale
+    fake = FakeBackend(generate_scale(sys.argv[1] if len(sys.argv) > 1 else '1k'))
+    print(f"Serving on {fake.start(port=int(sys.argv[2]) if len(sys.argv) > 2 else 8000)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
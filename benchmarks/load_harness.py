@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import time
+from collections import Counter, defaultdict
+import sandbox
+
+sandbox.prepare("gul_bot_load_")
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Update
+from fake_backend import FakeBackend
+from synthetic import generate_scale
+from callbacks import MenuCallback, PeriodCallback, OrderListCallback, CarouselCallback, CarouselActionCallback
+
+# Telegram methods whose result is a Message (everything else returns True)
+MESSAGE_METHODS = {
+    'sendMessage', 'sendPhoto', 'sendDocument', 'editMessageText', 'editMessageCaption',
+    'editMessageMedia', 'editMessageReplyMarkup'
+}
+
+_current_action = contextvars.ContextVar('current_action', default=None)
+
+# Bot session that answers API calls locally, with simulated latency and flood control
+class MockSession(BaseSession):
+    def __init__(self, latency: float = 0.05, jitter: float = 0.05, retry_after_rate: float = 0.0,
+                 retry_after: int = 1, seed: int = 1):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls = Counter()                      # API method -> calls
+        self.calls_by_action = defaultdict(Counter)  # action -> API method -> calls
+        self._message_id = 1000
+
+    def _result(self, method) -> object:
+        if method.__api_method__ not in MESSAGE_METHODS:
+            return True
+        self._message_id += 1
+        result = {
+            'message_id': getattr(method, 'message_id', None) or self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': getattr(method, 'chat_id', 0), 'type': 'private'},
+            'text': getattr(method, 'text', None) or "",
+        }
+        if method.__api_method__ in ('sendPhoto', 'editMessageMedia'):
+            result['photo'] = [{'file_id': f"photo{self._message_id}", 'file_unique_id': f"u{self._message_id}",
+                                'width': 1280, 'height': 960}]
+        return result
+
+    async def make_request(self, bot, method, timeout=None):
+        name = method.__api_method__
+        self.calls[name] += 1
+        action = _current_action.get()
+        if action is not None:
+            self.calls_by_action[action][name] += 1
+
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        if self.retry_after_rate and self.rng.random() < self.retry_after_rate:
+            content = {
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after}
+            }
+            status_code = 429
+        else:
+            content = {'ok': True, 'result': self._result(method)}
+            status_code = 200
+        response = self.check_response(bot=bot, method=method, status_code=status_code, content=json.dumps(content))
+        return response.result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+# Builds synthetic updates the way Telegram would deliver them for one admin
+class AdminSession:
+    def __init__(self, admin_id: int, rng: random.Random, pending_ids: list, all_ids: list):
+        self.admin_id = admin_id
+        self.rng = rng
+        self.pending_ids = pending_ids  # Shared pool: each pending order is approved/rejected once
+        self.all_ids = all_ids
+        self.carousel_index = 0
+
+    def _user(self) -> dict:
+        return {'id': self.admin_id, 'is_bot': False, 'first_name': f"Admin {self.admin_id}"}
+
+    def _chat(self) -> dict:
+        return {'id': self.admin_id, 'type': 'private'}
+
+    def text(self, update_id: int, text: str) -> Update:
+        message = {'message_id': update_id, 'date': int(time.time()), 'chat': self._chat(), 'from': self._user(), 'text': text}
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        return Update.model_validate({'update_id': update_id, 'message': message})
+
+    def callback(self, update_id: int, data: str, photo: bool = False) -> Update:
+        message = {
+            'message_id': update_id, 'date': int(time.time()), 'chat': self._chat(),
+            'from': {'id': 42, 'is_bot': True, 'first_name': "gul_bot"}
+        }
+        if photo:
+            message['photo'] = [{'file_id': "receipt", 'file_unique_id': "receipt", 'width': 1280, 'height': 960}]
+            message['caption'] = "order"
+        else:
+            message['text'] = "menu"
+        return Update.model_validate({'update_id': update_id, 'callback_query': {
+            'id': str(update_id), 'from': self._user(), 'chat_instance': str(self.admin_id),
+            'data': data, 'message': message
+        }})
+
+    # Returns (action name, update) for the next simulated click or message
+    def next_update(self, update_id: int):
+        action = self.rng.choices(ACTION_NAMES, weights=ACTION_WEIGHTS)[0]
+        if action == 'menu':
+            view = self.rng.choice(['stats', 'periods', 'finance', 'products', 'customers', 'main'])
+            return action, self.callback(update_id, MenuCallback(view=view).pack())
+        if action == 'period':
+            return action, self.callback(update_id, PeriodCallback(period=self.rng.choice(['today', 'yesterday', 'week', 'month'])).pack())
+        if action == 'command':
+            return action, self.text(update_id, self.rng.choice(['/start', '/stats', '/pending', '/finance', '/products']))
+        if action == 'open_carousel':
+            self.carousel_index = 0
+            return action, self.callback(update_id, OrderListCallback(status='pending', page=self.rng.randint(1, 3)).pack())
+        if action == 'paginate':
+            step = self.rng.choice([1, 1, 1, -1, 5])
+            self.carousel_index = max(self.carousel_index + step, 0)
+            return action, self.callback(update_id, CarouselCallback(status='pending', index=self.carousel_index).pack(), photo=True)
+        if action == 'moderate' and self.pending_ids:
+            order_id = self.pending_ids.pop()
+            verb = self.rng.choices(['approve', 'reject'], weights=[0.85, 0.15])[0]
+            data = CarouselActionCallback(action=verb, status='pending', index=self.carousel_index, order_id=order_id).pack()
+            return action, self.callback(update_id, data, photo=True)
+        return 'search', self.text(update_id, str(self.rng.choice(self.all_ids)))
+
+# Share of simulated admin actions
+ACTIONS = {
+    'menu': 0.25,
+    'period': 0.1,
+    'command': 0.1,
+    'open_carousel': 0.1,
+    'paginate': 0.25,
+    'moderate': 0.1,
+    'search': 0.1,
+}
+ACTION_NAMES = list(ACTIONS)
+ACTION_WEIGHTS = list(ACTIONS.values())
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+async def run_admin(dp, bot, admin: AdminSession, actions: int, think_time: float, update_ids, results):
+    for _ in range(actions):
+        action, update = admin.next_update(next(update_ids))
+        token = _current_action.set(action)
+        started = time.perf_counter()
+        error = None
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            _current_action.reset(token)
+        results.append((action, time.perf_counter() - started, error))
+        if think_time:
+            await asyncio.sleep(admin.rng.uniform(0, think_time))
+
+def report(results: list, session: MockSession, elapsed: float, admins: int) -> str:
+    latencies = [duration for _, duration, _ in results]
+    errors = Counter(error for _, _, error in results if error)
+    lines = [
+        f"Admins: {admins}, actions: {len(results)}, wall time: {elapsed:.2f}s",
+        f"Throughput: {len(results) / elapsed:.1f} actions/s",
+        f"Latency: p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms",
+        f"API calls: {sum(session.calls.values())} ({sum(session.calls.values()) / max(len(results), 1):.2f} per action)",
+        "",
+        f"{'action':<15}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'api/action':>12}  methods",
+    ]
+    by_action = defaultdict(list)
+    for action, duration, _ in results:
+        by_action[action].append(duration)
+    for action, durations in sorted(by_action.items()):
+        calls = session.calls_by_action[action]
+        methods = ", ".join(f"{name}={count / len(durations):.2f}" for name, count in calls.most_common())
+        lines.append(
+            f"{action:<15}{len(durations):>7}{percentile(durations, 0.5) * 1000:>10.1f}"
+            f"{percentile(durations, 0.99) * 1000:>10.1f}{sum(calls.values()) / len(durations):>12.2f}  {methods}"
+        )
+    if errors:
+        lines.append("")
+        lines.append("Errors: " + ", ".join(f"{name}={count}" for name, count in errors.most_common()))
+    return "\n".join(lines)
+
+async def main(args):
+    import config
+    from backend import backend
+    from bot import create_dispatcher
+    from status_updates import drain_status_changes
+    from runtime import configure_executor, loop_name
+
+    configure_executor()
+    print(f"Event loop: {loop_name()}")
+
+    orders = generate_scale(args.scale)
+    fake = FakeBackend(orders, latency=args.backend_latency, jitter=args.backend_latency / 2)
+    url = fake.start()
+    backend.base_url, backend.media_url = f"{url}/api/orders/", url
+
+    rng = random.Random(args.seed)
+    admin_ids = [1_000_000 + i for i in range(args.admins)]
+    config.ADMIN_IDS.update(admin_ids)
+    pending_ids = [order['id'] for order in orders if order['status'] == 'pending']
+    rng.shuffle(pending_ids)
+    all_ids = [order['id'] for order in orders]
+
+    session = MockSession(args.tg_latency, args.tg_jitter, args.retry_after_rate, args.retry_after, args.seed)
+    bot = Bot(token="42:LOAD-TEST", session=session)
+    dp = create_dispatcher(throttle_rate=args.throttle_rate)
+    update_ids = iter(range(1, 10 ** 9))
+    results = []
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            run_admin(dp, bot, AdminSession(admin_id, random.Random(rng.random()), pending_ids, all_ids),
+                      args.actions, args.think_time, update_ids, results)
+            for admin_id in admin_ids
+        ))
+        elapsed = time.perf_counter() - started
+        # Approve/reject PATCHes run in the background; let them reach the fake backend
+        await drain_status_changes()
+    finally:
+        fake.stop()
+    print(report(results, session, elapsed, args.admins))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feed synthetic admin updates into the Dispatcher without Telegram")
+    parser.add_argument("--admins", type=int, default=10, help="concurrent admins")
+    parser.add_argument("--actions", type=int, default=50, help="actions per admin")
+    parser.add_argument("--think-time", type=float, default=0.0, help="max pause between an admin's actions, s")
+    parser.add_argument("--scale", default="1k", help="synthetic dataset size (1k, 10k, 100k, 1m)")
+    parser.add_argument("--backend-latency", type=float, default=0.02, help="fake backend latency, s")
+    parser.add_argument("--tg-latency", type=float, default=0.05, help="simulated Telegram API latency, s")
+    parser.add_argument("--tg-jitter", type=float, default=0.05, help="extra random Telegram latency, s")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0, help="share of API calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after value of simulated 429s, s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="per-chat throttle, updates/s (0: off)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-uvloop", action="store_true", help="run on the default asyncio loop")
+    args = parser.parse_args()
+    from runtime import run
+    run(main(args), use_uvloop=not args.no_uvloop)
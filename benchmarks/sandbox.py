@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Makes the bot modules importable and keeps their SQLite files (order mirror, leases) out of the working tree.
+# Must run before any bot module is imported, as config reads the paths at import time
+def prepare(prefix: str) -> str:
+    for path in (REPO_DIR, BENCH_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    state_dir = tempfile.mkdtemp(prefix=prefix)
+    os.environ.setdefault("ORDERS_DB_PATH", os.path.join(state_dir, "orders.db"))
+    os.environ.setdefault("STATE_DB_PATH", os.path.join(state_dir, "state.db"))
+    return state_dir
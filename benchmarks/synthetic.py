@@ -0,0 +1,82 @@
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Named dataset sizes used by the benchmarks
+SCALES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+PRODUCTS = ['Ortacha gulqand', 'Katta gulqand']
+PRODUCT_WEIGHTS = [0.62, 0.38]
+QUANTITIES = [1, 2, 3, 4, 5]
+QUANTITY_WEIGHTS = [0.68, 0.2, 0.07, 0.03, 0.02]
+OPERATOR_CODES = ['90', '91', '93', '94', '95', '97', '98', '99', '33', '88']
+FIRST_NAMES = [
+    'Aziz', 'Dilnoza', 'Malika', 'Jasur', 'Nodira', 'Sardor', 'Gulnora', 'Bekzod', 'Shahnoza',
+    'Otabek', 'Madina', 'Rustam', 'Zarina', 'Farrux', 'Kamola', 'Timur', 'Laylo', 'Sherzod'
+]
+LAST_NAMES = [
+    'Karimov', 'Rahimova', 'Toshmatov', 'Yusupova', 'Abdullayev', 'Nazarova', 'Ismoilov',
+    'Qodirova', 'Ergashev', 'Saidova', 'Xolmatov', 'Mirzayeva'
+]
+# Relative order volume per hour of day (Tashkent time): quiet nights, evening peak
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 9, 10, 10, 11, 10, 9, 9, 10, 12, 14, 15, 14, 11, 6, 3]
+LOCAL_TZ = timezone(timedelta(hours=5))
+
+def _customers(rng: random.Random, count: int) -> list:
+    customers = []
+    for _ in range(count):
+        phone = f"+998{rng.choice(OPERATOR_CODES)}{rng.randint(0, 9_999_999):07d}"
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        customers.append((name, phone))
+    return customers
+
+# Orders shaped like the backend's /api/orders/ payload, oldest first
+def generate_orders(count: int, seed: int = 42, days: int = 365, now: datetime = None) -> list:
+    rng = random.Random(seed)
+    now = now or datetime.now(LOCAL_TZ)
+    start = now - timedelta(days=days)
+    # A third of the orders come from a small set of regulars (Pareto), the rest from the long tail
+    customers = _customers(rng, max(count // 3, 1))
+    day_offsets = sorted(rng.random() * days for _ in range(count))
+    hours = rng.choices(range(24), weights=HOURLY_WEIGHTS, k=count)
+    products = rng.choices(PRODUCTS, weights=PRODUCT_WEIGHTS, k=count)
+    quantities = rng.choices(QUANTITIES, weights=QUANTITY_WEIGHTS, k=count)
+
+    orders = []
+    for i, day_offset in enumerate(day_offsets):
+        order_id = i + 1
+        day = (start + timedelta(days=int(day_offset))).replace(hour=0, minute=0, second=0, microsecond=0)
+        created_at = day + timedelta(hours=hours[i], minutes=rng.randint(0, 59), seconds=rng.randint(0, 59))
+        # Recent orders are mostly still pending, older ones have been moderated
+        if now - created_at < timedelta(days=1):
+            status = rng.choices(['pending', 'approved', 'rejected'], weights=[0.6, 0.33, 0.07])[0]
+        else:
+            status = rng.choices(['pending', 'approved', 'rejected'], weights=[0.02, 0.86, 0.12])[0]
+        if rng.random() < 0.35:
+            customer = customers[min(int((rng.paretovariate(1.2) - 1) * 50), len(customers) - 1)]
+        else:
+            customer = rng.choice(customers)
+        orders.append({
+            'id': order_id,
+            'name': customer[0],
+            'phone': customer[1],
+            'product': products[i],
+            'quantity': quantities[i],
+            'status': status,
+            'created_at': created_at.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            'receipt': f"/media/receipts/receipt_{order_id}.jpg",
+        })
+    return orders
+
+def generate_scale(scale: str, seed: int = 42) -> list:
+    return generate_orders(SCALES[scale], seed=seed)
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/synthetic.py 10k > orders.json
+    json.dump(generate_scale(sys.argv[1] if len(sys.argv) > 1 else '1k'), sys.stdout, ensure_ascii=False)
@@ -1,40 +1,93 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from handlers import router
+from handlers import router, load_reports
 from order_checker import check_orders_loop
-from config import BOT_TOKEN
+from metrics import start_metrics_server
+from middlewares import TimingMiddleware, HandlerNameMiddleware, AccessMiddleware
+from loop_watchdog import start_watchdog
+from log_config import setup_logging
+from diagnostics import start_tracing
+from status_updates import drain_status_changes
+from jobs import job_queue
+from runtime import run, configure_executor, create_session, log_runtime
+from config import BOT_TOKEN, REPORTS_WARMUP_DELAY, THROTTLE_RATE
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Dispatcher with the bot's router and middlewares (also used by the load harness)
+def create_dispatcher(throttle_rate: float = THROTTLE_RATE) -> Dispatcher:
+    dp = Dispatcher()
+    # One admin check and per-chat throttle for all handlers
+    access = AccessMiddleware(rate=throttle_rate)
+    for observer in (router.message, router.callback_query):
+        # Rejected updates stop at the access check and are never timed
+        observer.outer_middleware(access)
+        # Time every accepted update and record which handler served it
+        observer.outer_middleware(TimingMiddleware())
+        observer.middleware(HandlerNameMiddleware())
+    dp.include_router(router)
+    return dp
+
+# Preload the reporting libraries once polling is up, so the first download is not slowed down
+async def warm_up_reports(delay: float):
+    await asyncio.sleep(delay)
+    try:
+        await load_reports()
+    except Exception as e:
+        logger.error(f"Error preloading reports: {e}")
+
 async def main():
     logger.info("Starting bot...")
     
+    # Thread pool for blocking calls and the Bot API connection pool (EXECUTOR_WORKERS, TELEGRAM_*)
+    executor = configure_executor()
+    session = create_session()
+    log_runtime(session, executor)
+
     # Initialize bot and dispatcher
-    bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher()
-    dp.include_router(router)
+    bot = Bot(token=BOT_TOKEN, session=session)
+    dp = create_dispatcher()
+
+    # Optional local /metrics endpoint (METRICS_PORT)
+    metrics_runner = await start_metrics_server()
+    # Optional event loop stall detection (WATCHDOG_ENABLED)
+    watchdog = start_watchdog()
 
     # Start background order checking task
     order_check_task = asyncio.create_task(check_orders_loop(bot))
+    warmup_task = asyncio.create_task(warm_up_reports(REPORTS_WARMUP_DELAY)) if REPORTS_WARMUP_DELAY >= 0 else None
     
     # Start polling
     logger.info("✅ Бот запущен и готов к работе!")
     try:
         await dp.start_polling(bot)
     except Exception as e:
-        logger.error(f"Error during bot execution: {e}")
+        logger.exception(f"Error during bot execution: {e}")
     finally:
+        # Approvals already acknowledged in the chat still reach the backend
+        await drain_status_changes()
+        await job_queue.stop()
+        await bot.session.close()
         # Properly cancel background task when bot is stopping
         if order_check_task and not order_check_task.cancelled():
             order_check_task.cancel()
+        if warmup_task:
+            warmup_task.cancel()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        if watchdog:
+            watchdog.stop()
             
         logger.info("Bot stopped")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # JSON log lines written by a background thread
+    log_listener = setup_logging()
+    # Allocation tracing for /debug_mem (TRACEMALLOC_FRAMES)
+    start_tracing()
+    try:
+        # uvloop when installed (USE_UVLOOP)
+        run(main())
+    finally:
+        log_listener.stop()
@@ -0,0 +1,102 @@
+import logging
+import re
+from typing import Literal
+from aiogram.filters.callback_data import CallbackData
+from log_config import handler_var
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = ":"  # aiogram's default CallbackData separator, used by every factory below
+Status = Literal['pending', 'approved', 'rejected']
+
+# Typed callback payloads: the prefix selects the handler, fields are validated when unpacked
+class MenuCallback(CallbackData, prefix="menu"):
+    view: Literal['main', 'stats', 'search', 'customers', 'download', 'periods', 'products', 'finance',
+                  'download_finance', 'download_products']
+
+class OrderListCallback(CallbackData, prefix="list"):
+    status: Status
+    page: int
+
+class ApprovalCallback(CallbackData, prefix="ap"):
+    action: Literal['approve', 'reject']
+    order_id: int
+
+class CarouselCallback(CallbackData, prefix="car"):
+    status: Status
+    index: int
+
+class CarouselActionCallback(CallbackData, prefix="cact"):
+    action: Literal['approve', 'reject']
+    status: Status
+    index: int
+    order_id: int
+
+class CarouselCloseCallback(CallbackData, prefix="carx"):
+    pass
+
+class PeriodCallback(CallbackData, prefix="per"):
+    period: Literal['today', 'yesterday', 'week', 'month']
+
+class PeriodDownloadCallback(CallbackData, prefix="perdl"):
+    period: Literal['today', 'yesterday', 'week', 'month']
+
+class FindPageCallback(CallbackData, prefix="find"):
+    page: int
+
+class JobCancelCallback(CallbackData, prefix="job"):
+    job_id: int
+
+# Page counters and other buttons that only need the spinner stopped
+class NoopCallback(CallbackData, prefix="noop"):
+    pass
+
+# Approve/reject buttons of notifications sent before typed callbacks ("approve_123")
+LEGACY_APPROVAL = re.compile(r"(approve|reject)_(\d+)")
+
+# Resolves a callback query to its handler with one dict lookup: the exact packed payload for
+# fieldless entries (menu items), otherwise the prefix. Handlers get (callback_query, bot, callback_data).
+class CallbackRouter:
+    def __init__(self):
+        self._handlers = {}  # packed payload or prefix -> (factory, handler)
+
+    def handler(self, factory, **fixed):
+        key = factory(**fixed).pack() if fixed else factory.__prefix__
+
+        def register(handler):
+            if key in self._handlers:
+                raise ValueError(f"Callback {key} is already handled by {self._handlers[key][1].__name__}")
+            self._handlers[key] = (factory, handler)
+            return handler
+        return register
+
+    def resolve(self, data: str):
+        entry = self._handlers.get(data) or self._handlers.get(data.split(SEPARATOR, 1)[0])
+        if entry is not None:
+            factory, handler = entry
+            return handler, factory.unpack(data)
+        legacy = LEGACY_APPROVAL.fullmatch(data)
+        if legacy:
+            return self.resolve(ApprovalCallback(action=legacy[1], order_id=int(legacy[2])).pack())
+        return None, None
+
+    # The single aiogram callback_query handler of the bot
+    async def dispatch(self, callback_query, bot, **data):
+        try:
+            handler, callback_data = self.resolve(callback_query.data or "")
+        except Exception as e:  # Any malformed payload, whatever the factory raises for it
+            logger.warning(f"Invalid callback data {callback_query.data!r}: {e}")
+            handler = None
+        if handler is None:
+            if 'timing' in data:
+                data['timing']['handler'] = None  # Counted as unhandled, under the "other" route
+            await bot.answer_callback_query(callback_query.id, "⚠️ Кнопка устарела, откройте /start")
+            return
+
+        # Report the real handler, not the dispatcher, in logs and metrics
+        if 'timing' in data:
+            data['timing']['handler'] = handler.__name__
+        handler_var.set(handler.__name__)
+        return await handler(callback_query, bot, callback_data)
+
+callback_router = CallbackRouter()
@@ -8,6 +8,83 @@ ADMIN_CHAT_ID = str(os.getenv("ADMIN_CHAT_ID", "714948319"))  # Convert to strin
 BACKEND_URL = "https://web-production-34229.up.railway.app/api/orders/"  # Ensure trailing slash
 MEDIA_URL = "https://web-production-34229.up.railway.app"
 
+# Chats and users allowed to use the bot (ints, as Telegram sends them)
+ADMIN_IDS = {714948319, 6094832311, 575262312, int(ADMIN_CHAT_ID)}
+
+# Per-chat throttling (token bucket): sustained updates per second and burst size.
+# Applies to admins' messages and commands and to everything from other chats; admins' buttons are exempt
+THROTTLE_RATE = 1.0
+THROTTLE_BURST = 5
+
 # Notification settings (default: enabled)
 NOTIFICATIONS_ENABLED = True
-NOTIFICATION_SOUND = True
\ No newline at end of file
+NOTIFICATION_SOUND = True
+DIGEST_THRESHOLD = 5           # More new orders than this within DIGEST_WINDOW are sent as a digest
+DIGEST_WINDOW = 60             # Seconds of notification history counted towards DIGEST_THRESHOLD
+DIGEST_MAX_ORDERS = 25         # Orders listed per digest message (keeps it under Telegram's text limit)
+DIGEST_ALBUM_SIZE = 10         # Receipts attached to a digest as an album (Telegram allows 2-10)
+
+# Order polling cadence (seconds)
+POLL_INTERVAL = 10             # Base interval between checks
+POLL_INTERVAL_MIN = 3          # Fastest cadence right after new orders arrive
+POLL_INTERVAL_MAX = 60         # Slowest cadence when nothing is happening
+POLL_IDLE_GROWTH = 1.5         # Interval multiplier applied after each idle check
+POLL_ACTIVITY_WINDOW = 120     # Orders seen within this window keep the fast cadence
+POLL_BACKOFF_MAX = 300         # Upper bound for the backoff after failed checks
+
+# Backend resilience settings
+# Per-endpoint (connect, read) timeouts in seconds
+BACKEND_TIMEOUTS = {
+    'list': (3.05, 20),      # GET /api/orders/ (full history can be large)
+    'detail': (3.05, 5),     # GET /api/orders/<id>/
+    'update': (3.05, 10),    # PATCH /api/orders/<id>/
+    'receipt': (3.05, 15),   # Receipt images from the media host
+}
+BACKEND_MAX_RETRIES = 2               # Extra attempts for idempotent (GET) requests
+BACKEND_RETRY_BACKOFF = 0.5           # Base delay for the jittered exponential backoff
+CIRCUIT_FAILURE_THRESHOLD = 5         # Consecutive failures that open the circuit
+CIRCUIT_RESET_TIMEOUT = 30            # Seconds before a half-open probe is allowed
+BACKEND_HEDGE_DELAY = float(os.getenv("BACKEND_HEDGE_DELAY", "0"))  # 0 disables GET hedging
+STATUS_UPDATE_ATTEMPTS = 3             # Background PATCH attempts for an approve/reject before giving up
+STATUS_UPDATE_RETRY_DELAY = 2         # Seconds before the second attempt, doubled for each next one
+
+# Multi-replica coordination
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "bot_state.db")  # SQLite file shared by all local replicas
+LEADER_LEASE_TTL = 8           # Seconds a leader lease stays valid without renewal (< POLL_INTERVAL)
+
+# Observability
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))   # Local /metrics endpoint port, 0 disables it
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+SLOW_UPDATE_THRESHOLD = float(os.getenv("SLOW_UPDATE_THRESHOLD", "1.0"))  # Seconds; slower updates are logged
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))        # Share of updates run under a profiler
+PROFILER = os.getenv("PROFILER", "cprofile")                              # "cprofile" or "pyinstrument"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")                        # Where slow-update traces are written
+PROFILE_KEEP = 50                                                         # Number of traces kept in PROFILE_DIR
+WATCHDOG_ENABLED = os.getenv("WATCHDOG_ENABLED", "0") == "1"                 # Event-loop stall detection
+WATCHDOG_THRESHOLD_MS = int(os.getenv("WATCHDOG_THRESHOLD_MS", "500"))       # Loop silence reported as a stall
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" (one object per line) or "text"
+REPORTS_WARMUP_DELAY = float(os.getenv("REPORTS_WARMUP_DELAY", "30"))       # Seconds after start to preload pandas/openpyxl, <0 disables
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "0"))              # Trace allocations from startup (0: start on /debug_mem)
+
+# Local order mirror (analytics views query it instead of the backend)
+ORDERS_DB_PATH = os.getenv("ORDERS_DB_PATH", "bot_orders.db")
+MIRROR_FULL_SYNC_INTERVAL = 300   # Seconds between full re-syncs of the order history
+
+# Order lookup cache (search by ID)
+ORDER_CACHE_TTL = 30          # Seconds a fetched order is reused
+ORDER_NOT_FOUND_TTL = 5       # Seconds a 404 is remembered for a mistyped ID
+
+# Background jobs for heavy admin tasks (Excel exports, period reports)
+JOB_WORKERS = 2               # Jobs running at the same time
+JOB_QUEUE_SIZE = 20           # Queued jobs beyond which new requests are refused
+JOB_PROGRESS_INTERVAL = 2     # Minimum seconds between progress message edits
+JOB_RESULTS_DIR = os.getenv("JOB_RESULTS_DIR", "job_results")  # Finished files, reused for identical requests
+JOB_RESULT_TTL = 24 * 3600    # Seconds a finished file is kept
+
+# Event loop and Telegram connection setup (applied at startup)
+USE_UVLOOP = os.getenv("USE_UVLOOP", "1") == "1"                # Run on uvloop when it is installed
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", "16"))     # Threads behind asyncio.to_thread (backend requests, SQLite)
+TELEGRAM_CONNECTION_LIMIT = 100    # Simultaneous connections to the Bot API
+TELEGRAM_DNS_CACHE_TTL = 600       # Seconds a resolved Bot API address is reused
+TELEGRAM_KEEPALIVE_TIMEOUT = 60    # Seconds an idle Bot API connection is kept open
@@ -0,0 +1,103 @@
+import os
+import resource
+import sys
+import tempfile
+import tracemalloc
+from config import TRACEMALLOC_FRAMES
+
+TOP_ALLOCATIONS = 10
+_previous_snapshot = None
+
+# Start tracing at startup when configured, so /debug_mem sees allocations from the beginning
+def start_tracing(frames: int = TRACEMALLOC_FRAMES) -> bool:
+    if frames and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return tracemalloc.is_tracing()
+
+def _mb(size: float) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+def rss_bytes() -> int:
+    # Current RSS from /proc on Linux, otherwise fall back to the peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return peak_rss_bytes()
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, KB elsewhere
+
+# Number of entries held by the bot's process-lifetime caches and sets
+def cache_sizes() -> dict:
+    import handlers
+    import rendering
+    from backend import backend
+    from metrics import DEDUP_SET_SIZE
+    from receipts import receipt_file_ids
+    from order_cache import _orders as cached_orders
+    from search_index import search_index
+    return {
+        'sent_order_ids': len(handlers.sent_order_ids),
+        'order notifications': len(handlers.order_notifications),
+        'order_checker sent_orders': DEDUP_SET_SIZE.value(set="order_checker") or 0,
+        'carousel orders': sum(len(orders) for _, orders in handlers._carousel_orders.values()),
+        'caption cache': len(rendering._caption_cache),
+        'approval_keyboard': rendering.approval_keyboard.cache_info().currsize,
+        'carousel_keyboard': rendering.carousel_keyboard.cache_info().currsize,
+        'receipt file_ids': len(receipt_file_ids),
+        'order lookup cache': len(cached_orders),
+        'search index orders': len(search_index.ids),
+        '/find results': len(handlers._find_results),
+        'backend stale snapshots': len(backend._snapshots),
+    }
+
+def _location(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{os.path.join(*frame.filename.split(os.sep)[-2:])}:{frame.lineno}"
+
+# Takes a snapshot and builds the /debug_mem report; blocking, run it in a worker thread
+def memory_report(dump: bool = False) -> tuple:
+    global _previous_snapshot
+    lines = [
+        "🧠 Память процесса:\n",
+        f"RSS: {_mb(rss_bytes())} (пик {_mb(peak_rss_bytes())})",
+    ]
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(TRACEMALLOC_FRAMES, 1))
+        lines.append("tracemalloc: запущен сейчас, места выделения появятся при следующем вызове")
+        snapshot = None
+    else:
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f"tracemalloc: {_mb(current)} (пик {_mb(peak)})")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+        lines.append("\n📌 Топ мест выделения памяти:")
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            lines.append(f"• {_location(stat)}: {stat.size / 1024:,.0f} KB ({stat.count} блоков)")
+
+        if _previous_snapshot is not None:
+            lines.append("\n📈 Изменения с прошлого снимка:")
+            for stat in snapshot.compare_to(_previous_snapshot, 'lineno')[:TOP_ALLOCATIONS]:
+                lines.append(f"• {_location(stat)}: {stat.size_diff / 1024:+,.0f} KB ({stat.count_diff:+} блоков)")
+
+    lines.append("\n🗃 Кэши и множества:")
+    for name, size in cache_sizes().items():
+        lines.append(f"• {name}: {size}")
+
+    dump_bytes = None
+    if snapshot is not None:
+        if dump:
+            with tempfile.NamedTemporaryFile(suffix=".tracemalloc") as f:
+                snapshot.dump(f.name)
+                dump_bytes = f.read()
+        _previous_snapshot = snapshot
+    return "\n".join(lines)[:4000], dump_bytes
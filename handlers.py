@@ -1,25 +1,54 @@
 from aiogram import Router, Bot, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message, InputMediaPhoto
 from aiogram.types.input_file import BufferedInputFile
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 import requests
-from datetime import datetime, timedelta
-from config import ADMIN_CHAT_ID, BACKEND_URL
-from collections import defaultdict
-import pandas as pd
-import io
+from datetime import datetime
+from config import ADMIN_CHAT_ID, ADMIN_IDS, DIGEST_ALBUM_SIZE
+from backend import backend
+from receipts import receipt_media, remember_receipt, receipt_file_ids
+from order_cache import lookup_order, remember_order
+from status_updates import start_status_change, status_change_in_flight
+from jobs import job_queue
+from callbacks import (
+    callback_router, MenuCallback, OrderListCallback, ApprovalCallback, CarouselCallback, CarouselActionCallback,
+    CarouselCloseCallback, PeriodCallback, PeriodDownloadCallback, FindPageCallback, JobCancelCallback, NoopCallback
+)
+from metrics import DEDUP_SET_SIZE
+from diagnostics import memory_report
+from order_store import order_store
+from search_index import search_orders
+from analytics import calculate_period_summary, format_finance_summary, format_product_stats, format_period_summary
+from rendering import (
+    order_caption, order_list_text,
+    approval_keyboard, period_details_keyboard, carousel_keyboard, MAIN_MENU_TEXT, MAIN_MENU_KEYBOARD,
+    ORDERS_MENU_KEYBOARD, PERIOD_KEYBOARD, FINANCE_KEYBOARD, PRODUCTS_KEYBOARD,
+    BACK_TO_MAIN_KEYBOARD, BACK_TO_PERIOD_KEYBOARD, CAROUSEL_CLOSE_KEYBOARD,
+    find_results_text, find_keyboard, FIND_PAGE_SIZE, STATUS_ICONS, digest_text, digest_keyboard,
+    processing_keyboard, BACK_TO_MAIN, NOOP
+)
+import asyncio
+import importlib
+from collections import OrderedDict
+import logging
 import os
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.chart import BarChart, Reference, PieChart
-from openpyxl.utils import get_column_letter
-from openpyxl.chart.label import DataLabelList
+import time
+
+logger = logging.getLogger(__name__)
 
 router = Router()
+# Every callback query goes through one dispatcher that picks the handler by its payload prefix
+router.callback_query.register(callback_router.dispatch)
 sent_order_ids = set()  # To track sent orders and avoid duplicates
 ORDERS_PER_PAGE = 5  # Number of orders to show per page
-
-# List of admin IDs
-ADMIN_IDS = {714948319, 6094832311, 575262312, ADMIN_CHAT_ID}  # Add your admin ID here
+CAROUSEL_CACHE_TTL = 30  # Seconds an order list is reused while browsing the carousel
+_carousel_orders = {}  # status -> (monotonic fetch time, orders)
+_find_results = {}  # chat_id -> (query, matching order IDs) of the last /find
+NOTIFICATION_TRACK_SIZE = 2000  # Orders whose notification messages are remembered for cross-chat updates
+# Order ID -> (caption, [(chat_id, message_id, is_photo)]) of the new-order notifications sent to admins
+order_notifications = OrderedDict()
+DEDUP_SET_SIZE.set_function(lambda: len(sent_order_ids), set="sent_order_ids")
 
 # Bot commands
 COMMANDS = {
@@ -33,338 +62,72 @@ COMMANDS = {
     'customers': '👥 Показать частых клиентов',
     'finance': '💰 Финансовая сводка',
     'products': '📦 Статистика по товарам',
-    'download': '📥 Скачать полный отчет'
+    'download': '📥 Скачать полный отчет',
+    'find': '🔎 Найти заказы по телефону или имени: /find 90123, /find Азиз',
+    'debug_mem': '🧠 Диагностика памяти (/debug_mem full - со снимком tracemalloc)'
 }
 
-# Helper function to format timestamp
-def format_timestamp(timestamp: str) -> str:
-    try:
-        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-        return dt.strftime('%d.%m.%Y %H:%M:%S')
-    except ValueError:
-        return timestamp
-
 # Helper function to get statistics
 async def get_statistics():
     try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        stats = {
-            'total': len(orders),
-            'approved': 0,
-            'rejected': 0,
-            'pending': 0,
-            'total_quantity': 0,
-            'products': defaultdict(int),
-            'customers': defaultdict(int)  # Track customer orders
-        }
-        
-        for order in orders:
-            stats[order['status']] += 1
-            stats['total_quantity'] += order['quantity']
-            stats['products'][order['product']] += order['quantity']
-            stats['customers'][order['phone']] += 1
-            
-        return stats
+        return await order_store.get_statistics()
     except Exception as e:
-        print(f"Error getting statistics: {e}")
+        logger.exception(f"Error getting statistics: {e}")
         return None
 
-# Helper function to apply styles to worksheet
-def apply_styles(worksheet, title, data_start_row=2):
-    # Define styles
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")  # Dark blue
-    title_font = Font(bold=True, size=14, color="1F4E78")  # Dark blue
-    title_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")  # Light blue
-    data_font = Font(size=11)
-    border = Border(
-        left=Side(style='thin', color='B4C6E7'),
-        right=Side(style='thin', color='B4C6E7'),
-        top=Side(style='thin', color='B4C6E7'),
-        bottom=Side(style='thin', color='B4C6E7')
-    )
-    center_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    left_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-    right_alignment = Alignment(horizontal='right', vertical='center', wrap_text=True)
-
-    # Apply title
-    title_cell = worksheet.cell(row=1, column=1, value=title)
-    title_cell.font = title_font
-    title_cell.fill = title_fill
-    title_cell.alignment = center_alignment
-    worksheet.merge_cells(start_row=1, start_column=1, end_row=1, end_column=worksheet.max_column)
-
-    # Apply header styles
-    for cell in worksheet[data_start_row]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_alignment
-        cell.border = border
-
-    # Apply data styles
-    for row in worksheet.iter_rows(min_row=data_start_row + 1, max_row=worksheet.max_row):
-        for cell in row:
-            cell.font = data_font
-            cell.border = border
-            # Align numbers to the right, text to the left
-            if isinstance(cell.value, (int, float)):
-                cell.alignment = right_alignment
-            else:
-                cell.alignment = left_alignment
-
-    # Auto-adjust column widths with some padding
-    for column in worksheet.columns:
-        max_length = 0
-        column = [cell for cell in column]
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 4)  # Add more padding
-        worksheet.column_dimensions[get_column_letter(column[0].column)].width = adjusted_width
-
-    # Freeze the header row
-    worksheet.freeze_panes = f"A{data_start_row + 1}"
-
-# Helper function to calculate order price and profit
-def calculate_order_price_and_profit(product: str, quantity: int) -> tuple:
-    prices = {
-        'Ortacha gulqand': 40000,  # Средний Гулканд
-        'Katta gulqand': 50000     # Большой Гулканд
-    }
-    costs = {
-        'Ortacha gulqand': 20000,  # Себестоимость среднего
-        'Katta gulqand': 25000     # Себестоимость большого
-    }
-    price = prices.get(product, 0) * quantity
-    cost = costs.get(product, 0) * quantity
-    profit = price - cost
-    return price, profit
+# Reporting stack (pandas/openpyxl) is imported on first use, keeping worker startup fast
+_reports = None
+
+async def load_reports():
+    global _reports
+    if _reports is None:
+        started = time.perf_counter()
+        _reports = await asyncio.to_thread(importlib.import_module, 'reports')
+        logger.info(f"Reporting module loaded in {time.perf_counter() - started:.2f}s")
+    return _reports
 
 # Helper function to generate Excel file
 async def generate_excel_file():
-    try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Create DataFrame
-        df = pd.DataFrame(orders)
-        
-        # Convert timestamp to readable format
-        df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%d.%m.%Y %H:%M:%S')
-        
-        # Calculate price and profit for each order
-        df[['price', 'profit']] = df.apply(
-            lambda x: pd.Series(calculate_order_price_and_profit(x['product'], x['quantity'])), 
-            axis=1
-        )
-        
-        # Reorder columns
-        df = df[['id', 'name', 'phone', 'product', 'quantity', 'price', 'profit', 'status', 'created_at']]
-        
-        # Rename columns
-        df.columns = ['ID', 'Имя', 'Телефон', 'Товар', 'Количество', 'Сумма', 'Прибыль', 'Статус', 'Дата создания']
-        
-        # Create Excel file in memory
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Sheet 1: All Orders
-            df.to_excel(writer, index=False, sheet_name='Заказы')
-            worksheet = writer.sheets['Заказы']
-            apply_styles(worksheet, "Список всех заказов")
-
-            # Sheet 2: Statistics
-            # Calculate statistics
-            total_orders = len(orders)
-            approved_orders = len(df[df["Статус"] == "approved"])
-            rejected_orders = len(df[df["Статус"] == "rejected"])
-            pending_orders = len(df[df["Статус"] == "pending"])
-            total_quantity = df["Количество"].sum()
-            total_revenue = df[df["Статус"] == "approved"]["Сумма"].sum()
-            total_profit = df[df["Статус"] == "approved"]["Прибыль"].sum()
-            
-            # Create statistics DataFrame
-            stats_data = {
-                'Показатель': [
-                    'Всего заказов',
-                    'Одобрено',
-                    'Отклонено',
-                    'Ожидает',
-                    'Всего товаров',
-                    'Общая выручка',
-                    'Общая прибыль'
-                ],
-                'Значение': [
-                    total_orders,
-                    approved_orders,
-                    rejected_orders,
-                    pending_orders,
-                    total_quantity,
-                    f"{total_revenue:,.0f} сум",
-                    f"{total_profit:,.0f} сум"
-                ]
-            }
-            
-            # Add product prices
-            prices_data = {
-                'Товар': ['Большой Гулканд', 'Средний Гулканд'],
-                'Цена': ['50,000 сум', '40,000 сум'],
-                'Себестоимость': ['25,000 сум', '20,000 сум'],
-                'Маржа': ['25,000 сум', '20,000 сум']
-            }
-            
-            # Add popular products
-            product_stats = df.groupby('Товар').agg({
-                'Количество': 'sum',
-                'Сумма': 'sum',
-                'Прибыль': 'sum'
-            }).reset_index()
-            product_stats = product_stats.sort_values('Количество', ascending=False)
-            
-            # Create statistics sheet
-            stats_df = pd.DataFrame(stats_data)
-            stats_df.to_excel(writer, index=False, sheet_name='Статистика', startrow=0)
-            
-            # Add prices information
-            prices_df = pd.DataFrame(prices_data)
-            prices_df.to_excel(writer, index=False, sheet_name='Статистика', startrow=len(stats_data) + 3)
-            
-            # Add product statistics
-            product_stats.to_excel(writer, index=False, sheet_name='Статистика', startrow=len(stats_data) + len(prices_data) + 6)
-            
-            worksheet = writer.sheets['Статистика']
-            apply_styles(worksheet, "Статистика заказов")
-
-            # Add pie chart for status distribution
-            pie = PieChart()
-            pie.title = "Распределение статусов заказов"
-            pie.style = 10
-            pie.height = 10
-            pie.width = 15
-            
-            data_labels = DataLabelList()
-            data_labels.showVal = True
-            data_labels.showPercent = True
-            pie.dLbls = data_labels
-            
-            # Create data for pie chart
-            status_data = pd.DataFrame({
-                'Статус': ['Одобрено', 'Отклонено', 'Ожидает'],
-                'Количество': [approved_orders, rejected_orders, pending_orders]
-            })
-            status_data.to_excel(writer, index=False, sheet_name='Статистика', 
-                               startrow=len(stats_data) + len(prices_data) + len(product_stats) + 9)
-            
-            data = Reference(worksheet, 
-                           min_col=2, 
-                           min_row=len(stats_data) + len(prices_data) + len(product_stats) + 10,
-                           max_row=len(stats_data) + len(prices_data) + len(product_stats) + 12,
-                           max_col=2)
-            categories = Reference(worksheet,
-                                min_col=1,
-                                min_row=len(stats_data) + len(prices_data) + len(product_stats) + 10,
-                                max_row=len(stats_data) + len(prices_data) + len(product_stats) + 12)
-            
-            pie.add_data(data, titles_from_data=True)
-            pie.set_categories(categories)
-            worksheet.add_chart(pie, "E2")
-
-            # Add pie chart for product distribution
-            product_pie = PieChart()
-            product_pie.title = "Распределение продаж по товарам"
-            product_pie.style = 10
-            product_pie.height = 10
-            product_pie.width = 15
-            
-            product_data_labels = DataLabelList()
-            product_data_labels.showVal = True
-            product_data_labels.showPercent = True
-            product_pie.dLbls = product_data_labels
-            
-            # Create data for product pie chart
-            product_distribution = df[df['Статус'] == 'approved'].groupby('Товар')['Количество'].sum().reset_index()
-            product_distribution.to_excel(writer, index=False, sheet_name='Статистика', 
-                                        startrow=len(stats_data) + len(prices_data) + len(product_stats) + 15)
-            
-            product_data = Reference(worksheet,
-                                  min_col=2,
-                                  min_row=len(stats_data) + len(prices_data) + len(product_stats) + 16,
-                                  max_row=len(stats_data) + len(prices_data) + len(product_stats) + 17,
-                                  max_col=2)
-            product_categories = Reference(worksheet,
-                                        min_col=1,
-                                        min_row=len(stats_data) + len(prices_data) + len(product_stats) + 16,
-                                        max_row=len(stats_data) + len(prices_data) + len(product_stats) + 17)
-            
-            product_pie.add_data(product_data, titles_from_data=True)
-            product_pie.set_categories(product_categories)
-            worksheet.add_chart(product_pie, "E20")
-
-            # Add bar chart for popular products
-            chart = BarChart()
-            chart.title = "Популярные товары"
-            chart.y_axis.title = "Количество"
-            chart.x_axis.title = "Товар"
-            
-            data = Reference(worksheet,
-                           min_col=2,
-                           min_row=len(stats_data) + len(prices_data) + 7,
-                           max_row=len(stats_data) + len(prices_data) + len(product_stats) + 6,
-                           max_col=2)
-            categories = Reference(worksheet,
-                                min_col=1,
-                                min_row=len(stats_data) + len(prices_data) + 7,
-                                max_row=len(stats_data) + len(prices_data) + len(product_stats) + 6)
-            
-            chart.add_data(data, titles_from_data=True)
-            chart.set_categories(categories)
-            worksheet.add_chart(chart, "E38")
-        
-        output.seek(0)
-        return output
-    except Exception as e:
-        print(f"Error generating Excel file: {e}")
-        return None
+    reports = await load_reports()
+    return await reports.generate_excel_file()
+
+# Helper function to queue the full Excel export: identical requests share one job and its stored file
+async def queue_excel_export(bot: Bot, chat_id):
+    # The mirror revision changes with every order change, so an unchanged mirror reuses the last file
+    revision = await order_store.get_revision()
+
+    async def run(progress):
+        await progress("Загрузка модуля отчётов...")
+        reports = await load_reports()
+        excel_file = await reports.generate_excel_file(progress)
+        if excel_file:
+            return excel_file, f"statistics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+    await job_queue.submit(bot, chat_id, f"xlsx:full:{revision}", "📊 Статистика заказов", run)
+
+# Helper function to queue the Excel export of a period menu entry
+async def queue_period_export(bot: Bot, chat_id, period: str):
+    revision = await order_store.get_revision()
+    # Periods end now: results are shared within the minute
+    minute = datetime.now().strftime('%Y%m%d%H%M')
+
+    async def run(progress):
+        await progress("Загрузка модуля отчётов...")
+        reports = await load_reports()
+        excel_file = await reports.generate_period_file(period, progress)
+        if excel_file:
+            return excel_file, f"orders_{period}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+    await job_queue.submit(bot, chat_id, f"xlsx:period:{period}:{revision}:{minute}", f"📊 Заказы за период: {period}", run)
 
 # Handle "/start" command
 @router.message(Command("start"))
 async def handle_start(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Статистика", callback_data="view_stats")],
-        [InlineKeyboardButton(text="📜 Одобренные", callback_data="view_approved_1")],
-        [InlineKeyboardButton(text="🚫 Отклонённые", callback_data="view_rejected_1")],
-        [InlineKeyboardButton(text="⏳ Ожидающие", callback_data="view_pending_1")],
-        [InlineKeyboardButton(text="🔍 Поиск по ID", callback_data="search_by_id")],
-        [InlineKeyboardButton(text="📱 Частые клиенты", callback_data="view_customers")],
-        [InlineKeyboardButton(text="📥 Скачать статистику", callback_data="download_stats")],
-        [InlineKeyboardButton(text="📅 Заказы за период", callback_data="select_period")],
-        [InlineKeyboardButton(text="📈 Топ товары", callback_data="top_products")],
-        [InlineKeyboardButton(text="💰 Финансовая сводка", callback_data="financial_summary")]
-    ])
-
-    await message.answer(
-        "👋 Добро пожаловать в админ-панель!\n"
-        "Выберите действие:",
-        reply_markup=keyboard
-    )
+    await message.answer(MAIN_MENU_TEXT, reply_markup=MAIN_MENU_KEYBOARD)
 
 # Handle "/help" command
 @router.message(Command("help"))
 async def handle_help(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-
     help_text = "📝 Список доступных команд:\n\n"
     for cmd, desc in COMMANDS.items():
         help_text += f"/{cmd} - {desc}\n"
@@ -374,10 +137,6 @@ async def handle_help(message: Message, bot: Bot):
 # Handle "/stats" command
 @router.message(Command("stats"))
 async def handle_stats_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-
     stats = await get_statistics()
     if not stats:
         await message.answer("❌ Ошибка при получении статистики")
@@ -401,235 +160,67 @@ async def handle_stats_command(message: Message, bot: Bot):
 # Handle "/orders" command
 @router.message(Command("orders"))
 async def handle_orders_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📜 Одобренные", callback_data="view_approved_1")],
-        [InlineKeyboardButton(text="🚫 Отклонённые", callback_data="view_rejected_1")],
-        [InlineKeyboardButton(text="⏳ Ожидающие", callback_data="view_pending_1")]
-    ])
-
     await message.answer(
         "📋 Выберите тип заказов для просмотра:",
-        reply_markup=keyboard
+        reply_markup=ORDERS_MENU_KEYBOARD
     )
 
-# Handle "/pending" command
-@router.message(Command("pending"))
-async def handle_pending_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-    
+# Helper function to send the first page of orders with a given status
+async def send_status_list(message: Message, status: str, title: str, empty_text: str):
     try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Filter pending orders
-        pending_orders = [order for order in orders if order['status'] == 'pending']
-        
-        if not pending_orders:
-            await message.answer(
-                "❌ Нет ожидающих заказов",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-                ])
-            )
+        orders = await backend.get_orders()
+        status_orders = [order for order in orders if order.status == status]
+
+        if not status_orders:
+            await message.answer(empty_text, reply_markup=BACK_TO_MAIN_KEYBOARD)
             return
-        
-        # Show first page of pending orders
+
+        # Show first page
         page = 1
-        orders_per_page = 5
-        start_idx = (page - 1) * orders_per_page
-        end_idx = start_idx + orders_per_page
-        current_orders = pending_orders[start_idx:end_idx]
-        
-        message_text = f"📋 Ожидающие заказы (страница {page}):\n\n"
-        
-        for order in current_orders:
-            price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-            message_text += (
-                f"🆔 {order['id']}\n"
-                f"👤 {order['name']}\n"
-                f"📱 {order['phone']}\n"
-                f"📦 {order['product']} x{order['quantity']}\n"
-                f"💰 {price:,.0f} сум\n"
-                f"📅 {datetime.fromisoformat(order['created_at'].replace('Z', '+00:00')).strftime('%d.%m.%Y %H:%M')}\n\n"
-            )
-        
+        current_orders = status_orders[(page - 1) * ORDERS_PER_PAGE:page * ORDERS_PER_PAGE]
+        message_text = order_list_text(title, current_orders, page)
+
         # Add navigation buttons
         keyboard = []
-        if len(pending_orders) > orders_per_page:
+        if len(status_orders) > ORDERS_PER_PAGE:
             keyboard.append([
-                InlineKeyboardButton(text="⬅️", callback_data=f"view_pending_{page-1}"),
-                InlineKeyboardButton(text=f"{page}/{(len(pending_orders)-1)//orders_per_page + 1}", callback_data="page"),
-                InlineKeyboardButton(text="➡️", callback_data=f"view_pending_{page+1}")
+                InlineKeyboardButton(text="⬅️", callback_data=OrderListCallback(status=status, page=page-1).pack()),
+                InlineKeyboardButton(text=f"{page}/{(len(status_orders)-1)//ORDERS_PER_PAGE + 1}", callback_data=NOOP),
+                InlineKeyboardButton(text="➡️", callback_data=OrderListCallback(status=status, page=page+1).pack())
             ])
-        
-        keyboard.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")])
-        
+
+        keyboard.append([InlineKeyboardButton(text="🔙 Назад", callback_data=BACK_TO_MAIN)])
+
         await message.answer(
             text=message_text,
             reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
         )
-        
+
     except Exception as e:
-        print(f"Error handling pending orders: {e}")
+        logger.exception(f"Error handling {status} orders: {e}")
         await message.answer(
             "❌ Ошибка при получении данных",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
+            reply_markup=BACK_TO_MAIN_KEYBOARD
         )
 
+# Handle "/pending" command
+@router.message(Command("pending"))
+async def handle_pending_command(message: Message, bot: Bot):
+    await send_status_list(message, 'pending', "Ожидающие заказы", "❌ Нет ожидающих заказов")
+
 # Handle "/approved" command
 @router.message(Command("approved"))
 async def handle_approved_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-    
-    try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Filter approved orders
-        approved_orders = [order for order in orders if order['status'] == 'approved']
-        
-        if not approved_orders:
-            await message.answer(
-                "❌ Нет одобренных заказов",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-                ])
-            )
-            return
-        
-        # Show first page of approved orders
-        page = 1
-        orders_per_page = 5
-        start_idx = (page - 1) * orders_per_page
-        end_idx = start_idx + orders_per_page
-        current_orders = approved_orders[start_idx:end_idx]
-        
-        message_text = f"📋 Одобренные заказы (страница {page}):\n\n"
-        
-        for order in current_orders:
-            price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-            message_text += (
-                f"🆔 {order['id']}\n"
-                f"👤 {order['name']}\n"
-                f"📱 {order['phone']}\n"
-                f"📦 {order['product']} x{order['quantity']}\n"
-                f"💰 {price:,.0f} сум\n"
-                f"📅 {datetime.fromisoformat(order['created_at'].replace('Z', '+00:00')).strftime('%d.%m.%Y %H:%M')}\n\n"
-            )
-        
-        # Add navigation buttons
-        keyboard = []
-        if len(approved_orders) > orders_per_page:
-            keyboard.append([
-                InlineKeyboardButton(text="⬅️", callback_data=f"view_approved_{page-1}"),
-                InlineKeyboardButton(text=f"{page}/{(len(approved_orders)-1)//orders_per_page + 1}", callback_data="page"),
-                InlineKeyboardButton(text="➡️", callback_data=f"view_approved_{page+1}")
-            ])
-        
-        keyboard.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")])
-        
-        await message.answer(
-            text=message_text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-        )
-        
-    except Exception as e:
-        print(f"Error handling approved orders: {e}")
-        await message.answer(
-            "❌ Ошибка при получении данных",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
-        )
+    await send_status_list(message, 'approved', "Одобренные заказы", "❌ Нет одобренных заказов")
 
 # Handle "/rejected" command
 @router.message(Command("rejected"))
 async def handle_rejected_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-    
-    try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Filter rejected orders
-        rejected_orders = [order for order in orders if order['status'] == 'rejected']
-        
-        if not rejected_orders:
-            await message.answer(
-                "❌ Нет отклоненных заказов",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-                ])
-            )
-            return
-        
-        # Show first page of rejected orders
-        page = 1
-        orders_per_page = 5
-        start_idx = (page - 1) * orders_per_page
-        end_idx = start_idx + orders_per_page
-        current_orders = rejected_orders[start_idx:end_idx]
-        
-        message_text = f"📋 Отклоненные заказы (страница {page}):\n\n"
-        
-        for order in current_orders:
-            price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-            message_text += (
-                f"🆔 {order['id']}\n"
-                f"👤 {order['name']}\n"
-                f"📱 {order['phone']}\n"
-                f"📦 {order['product']} x{order['quantity']}\n"
-                f"💰 {price:,.0f} сум\n"
-                f"📅 {datetime.fromisoformat(order['created_at'].replace('Z', '+00:00')).strftime('%d.%m.%Y %H:%M')}\n\n"
-            )
-        
-        # Add navigation buttons
-        keyboard = []
-        if len(rejected_orders) > orders_per_page:
-            keyboard.append([
-                InlineKeyboardButton(text="⬅️", callback_data=f"view_rejected_{page-1}"),
-                InlineKeyboardButton(text=f"{page}/{(len(rejected_orders)-1)//orders_per_page + 1}", callback_data="page"),
-                InlineKeyboardButton(text="➡️", callback_data=f"view_rejected_{page+1}")
-            ])
-        
-        keyboard.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")])
-        
-        await message.answer(
-            text=message_text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
-        )
-        
-    except Exception as e:
-        print(f"Error handling rejected orders: {e}")
-        await message.answer(
-            "❌ Ошибка при получении данных",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
-        )
+    await send_status_list(message, 'rejected', "Отклоненные заказы", "❌ Нет отклоненных заказов")
 
 # Handle "/customers" command
 @router.message(Command("customers"))
 async def handle_customers_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-
     stats = await get_statistics()
     if not stats:
         await message.answer("❌ Ошибка при получении данных")
@@ -647,454 +238,385 @@ async def handle_customers_command(message: Message, bot: Bot):
 # Handle "/finance" command
 @router.message(Command("finance"))
 async def handle_finance_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-    
     try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Calculate financial metrics
-        total_revenue = 0
-        total_profit = 0
-        daily_revenue = defaultdict(int)
-        daily_profit = defaultdict(int)
-        product_stats = defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
-        
-        for order in orders:
-            if order['status'] == 'approved':
-                price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-                total_revenue += price
-                total_profit += profit
-                
-                # Group by date
-                date = datetime.fromisoformat(order['created_at'].replace('Z', '+00:00')).strftime('%Y-%m-%d')
-                daily_revenue[date] += price
-                daily_profit[date] += profit
-                
-                # Group by product
-                product_stats[order['product']]['quantity'] += order['quantity']
-                product_stats[order['product']]['revenue'] += price
-                product_stats[order['product']]['profit'] += profit
-        
-        # Calculate average daily revenue and profit
-        avg_daily_revenue = total_revenue / len(daily_revenue) if daily_revenue else 0
-        avg_daily_profit = total_profit / len(daily_profit) if daily_profit else 0
-        
-        message_text = (
-            "💰 Финансовая сводка:\n\n"
-            f"📈 Общая выручка: {total_revenue:,.0f} сум\n"
-            f"💵 Общая прибыль: {total_profit:,.0f} сум\n"
-            f"📊 Средняя дневная выручка: {avg_daily_revenue:,.0f} сум\n"
-            f"📊 Средняя дневная прибыль: {avg_daily_profit:,.0f} сум\n\n"
-            "📈 Статистика по товарам:\n"
-        )
-        
-        # Add product statistics
-        for product, stats in product_stats.items():
-            message_text += (
-                f"📦 {product}:\n"
-                f"   • Количество: {stats['quantity']} шт.\n"
-                f"   • Выручка: {stats['revenue']:,.0f} сум\n"
-                f"   • Прибыль: {stats['profit']:,.0f} сум\n\n"
-            )
-        
-        # Show last 7 days
-        message_text += "📅 Последние 7 дней:\n"
-        last_7_days = sorted(daily_revenue.items(), reverse=True)[:7]
-        for date, revenue in last_7_days:
-            profit = daily_profit[date]
-            message_text += (
-                f"📅 {date}: "
-                f"💰 {revenue:,.0f} сум | "
-                f"💵 {profit:,.0f} сум\n"
-            )
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📥 Скачать детали", callback_data="download_financial")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
-        
+        summary = await order_store.get_finance_summary()
+
         await message.answer(
-            text=message_text,
-            reply_markup=keyboard
+            text=format_finance_summary(summary),
+            reply_markup=FINANCE_KEYBOARD
         )
-        
+
     except Exception as e:
-        print(f"Error handling financial summary: {e}")
+        logger.exception(f"Error handling financial summary: {e}")
         await message.answer(
             text="❌ Ошибка при получении данных.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
+            reply_markup=BACK_TO_MAIN_KEYBOARD
         )
 
 # Handle "/products" command
 @router.message(Command("products"))
 async def handle_products_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-    
     try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Calculate product statistics
-        product_stats = defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
-        
-        for order in orders:
-            if order['status'] == 'approved':
-                price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-                product_stats[order['product']]['quantity'] += order['quantity']
-                product_stats[order['product']]['revenue'] += price
-                product_stats[order['product']]['profit'] += profit
-        
-        # Sort by quantity
-        sorted_products = sorted(product_stats.items(), key=lambda x: x[1]['quantity'], reverse=True)
-        
-        message_text = "📈 Топ товаров:\n\n"
-        
-        for product, stats in sorted_products:
-            message_text += (
-                f"📦 {product}:\n"
-                f"   • Количество: {stats['quantity']} шт.\n"
-                f"   • Выручка: {stats['revenue']:,.0f} сум\n"
-                f"   • Прибыль: {stats['profit']:,.0f} сум\n"
-                f"   • Средняя цена: {stats['revenue']/stats['quantity']:,.0f} сум\n\n"
-            )
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📥 Скачать детали", callback_data="download_products")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
-        
+        product_stats = await order_store.get_product_stats()
+
         await message.answer(
-            text=message_text,
-            reply_markup=keyboard
+            text=format_product_stats(product_stats),
+            reply_markup=PRODUCTS_KEYBOARD
         )
-        
+
     except Exception as e:
-        print(f"Error handling top products: {e}")
+        logger.exception(f"Error handling top products: {e}")
         await message.answer(
             text="❌ Ошибка при получении данных.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
+            reply_markup=BACK_TO_MAIN_KEYBOARD
         )
 
 # Handle "/download" command
 @router.message(Command("download"))
 async def handle_download_command(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        await message.answer("Вы не администратор!")
-        return
-    
     try:
-        await message.answer("⏳ Генерация файла...")
-        
-        excel_file = await generate_excel_file()
-        if not excel_file:
-            await message.answer("❌ Ошибка при генерации файла статистики.")
-            return
-
-        # Send the Excel file
-        file = BufferedInputFile(
-            excel_file.getvalue(),
-            filename=f"statistics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        await queue_excel_export(bot, message.chat.id)
+    except Exception as e:
+        logger.exception(f"Error queueing Excel export: {e}")
+        await message.answer(
+            text="❌ Ошибка при генерации файла.",
+            reply_markup=BACK_TO_MAIN_KEYBOARD
         )
-        
+
+# Handle "/debug_mem" command
+@router.message(Command("debug_mem"))
+async def handle_debug_mem_command(message: Message, bot: Bot):
+    dump = message.text.split()[-1] == "full"
+    try:
+        # Snapshots of a large heap take a while, keep them off the event loop
+        report, snapshot = await asyncio.to_thread(memory_report, dump)
+    except Exception as e:
+        logger.exception(f"Error building memory report: {e}")
+        await message.answer("❌ Ошибка при сборе данных о памяти")
+        return
+
+    await message.answer(report)
+    if snapshot:
         await bot.send_document(
             chat_id=message.chat.id,
-            document=file,
-            caption="📊 Статистика заказов"
-        )
+            document=BufferedInputFile(snapshot, filename=f"memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tracemalloc"),
+            caption="📎 Снимок tracemalloc (tracemalloc.Snapshot.load)"
+        )
+
+# Helper function to show one page of /find results
+async def show_find_page(chat_id, page: int) -> tuple:
+    query, order_ids = _find_results[chat_id]
+    pages = max((len(order_ids) - 1) // FIND_PAGE_SIZE + 1, 1)
+    page = max(1, min(page, pages))
+    orders = await order_store.get_orders_by_ids(order_ids[(page - 1) * FIND_PAGE_SIZE:page * FIND_PAGE_SIZE])
+    return find_results_text(query, orders, page, pages, len(order_ids)), find_keyboard(page, pages)
+
+# Handle "/find" command: search by phone prefix or customer name
+@router.message(Command("find"))
+async def handle_find_command(message: Message, bot: Bot, command: CommandObject):
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("🔎 Укажите телефон (можно начало номера) или имя клиента:\n/find 90123\n/find Азиз Каримов")
+        return
 
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
-        await message.answer(
-            text="✅ Файл статистики успешно сгенерирован",
-            reply_markup=keyboard
-        )
-        
+    try:
+        order_ids = await search_orders(query)
     except Exception as e:
-        print(f"Error generating Excel file: {e}")
-        await message.answer(
-            text="❌ Ошибка при генерации файла.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
-        )
+        logger.exception(f"Error searching orders: {e}")
+        await message.answer("❌ Ошибка при поиске заказов", reply_markup=BACK_TO_MAIN_KEYBOARD)
+        return
+
+    if not order_ids:
+        await message.answer(f"❌ По запросу «{query}» ничего не найдено", reply_markup=BACK_TO_MAIN_KEYBOARD)
+        return
+
+    _find_results[message.chat.id] = (query, order_ids)
+    text, keyboard = await show_find_page(message.chat.id, 1)
+    await message.answer(text, reply_markup=keyboard)
+
+# Handle /find pagination
+@callback_router.handler(FindPageCallback)
+async def handle_find_page(callback_query: CallbackQuery, bot: Bot, callback_data: FindPageCallback):
+    chat_id = callback_query.message.chat.id
+    if chat_id not in _find_results:
+        await bot.answer_callback_query(callback_query.id, "Результаты поиска устарели, повторите /find")
+        return
+
+    text, keyboard = await show_find_page(chat_id, callback_data.page)
+    await bot.edit_message_text(
+        chat_id=chat_id,
+        message_id=callback_query.message.message_id,
+        text=text,
+        reply_markup=keyboard
+    )
+    await bot.answer_callback_query(callback_query.id)
 
 # Handle search by ID
-@router.callback_query(lambda c: c.data == "search_by_id")
-async def handle_search_prompt(callback_query: CallbackQuery, bot: Bot):
+@callback_router.handler(MenuCallback, view="search")
+async def handle_search_prompt(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
     await bot.edit_message_text(
         chat_id=callback_query.message.chat.id,
         message_id=callback_query.message.message_id,
         text="🔍 Введите ID заказа для поиска:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
+        reply_markup=BACK_TO_MAIN_KEYBOARD
     )
     await bot.answer_callback_query(callback_query.id)
 
 # Handle search by ID message
 @router.message(F.text.regexp(r'^\d+$'))
 async def handle_search_by_id(message: Message, bot: Bot):
-    if message.chat.id not in ADMIN_IDS:
-        return
-
     order_id = message.text
     try:
-        response = requests.get(f"{BACKEND_URL}{order_id}/")
-        response.raise_for_status()
-        order = response.json()
-
-        caption = (
-            f"🔍 Результаты поиска по ID: {order_id}\n\n"
-            f"🆔 ID: {order_id}\n"
-            f"👤 Имя: {order['name']}\n"
-            f"📅 Время: {format_timestamp(order['created_at'])}\n"
-            f"📱 Телефон: {order['phone']}\n"
-            f"📦 Товар: {order['product']}\n"
-            f"🔢 Количество: {order['quantity']}\n"
-            f"📝 Статус: {order['status']}\n"
-        )
-
-        keyboard_buttons = []
-        if order['status'] == 'pending':
-            keyboard_buttons.append([
-                InlineKeyboardButton(text=f"✅ Одобрить {order_id}", callback_data=f"approve_{order_id}"),
-                InlineKeyboardButton(text=f"❌ Отклонить {order_id}", callback_data=f"reject_{order_id}")
-            ])
+        # Repeat lookups and mistyped IDs are answered from the short-lived lookup cache
+        order = await lookup_order(order_id)
+        if order is None:
+            await bot.send_message(
+                chat_id=message.chat.id,
+                text=f"❌ Заказ с ID {order_id} не найден.",
+                reply_markup=BACK_TO_MAIN_KEYBOARD
+            )
+            return
 
-        base_url = BACKEND_URL.replace('/api/orders/', '')
-        receipt_url = order['receipt'] if order['receipt'].startswith('http') else f"{base_url}{order['receipt']}"
+        caption = order_caption(order, 'search')
+        keyboard = approval_keyboard(order_id, inline=True) if order.status == 'pending' else None
 
         try:
-            receipt_response = requests.get(receipt_url)
-            receipt_response.raise_for_status()
-
-            receipt_file = BufferedInputFile(receipt_response.content, filename=f"receipt_{order_id}.jpg")
-            await bot.send_photo(
+            sent = await bot.send_photo(
                 chat_id=message.chat.id,
-                photo=receipt_file,
+                photo=await receipt_media(order),
                 caption=caption,
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons) if keyboard_buttons else None
+                reply_markup=keyboard
             )
+            remember_receipt(order_id, sent)
         except requests.RequestException as e:
-            print(f"Ошибка при загрузке чека: {e} для Order ID: {order_id}")
+            logger.error(f"Ошибка при загрузке чека: {e} для Order ID: {order_id}", extra={'order_id': order_id})
             await bot.send_message(
                 chat_id=message.chat.id,
                 text=f"{caption}\n❌ Ошибка: Не удалось загрузить чек.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons) if keyboard_buttons else None
+                reply_markup=keyboard
             )
         except Exception as e:
-            print(f"Ошибка при отправке фото: {e} для Order ID: {order_id}")
+            logger.exception(f"Ошибка при отправке фото: {e} для Order ID: {order_id}", extra={'order_id': order_id})
             await bot.send_message(
                 chat_id=message.chat.id,
                 text=f"{caption}\n❌ Ошибка: Не удалось отправить чек.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons) if keyboard_buttons else None
+                reply_markup=keyboard
             )
 
         # Add back button
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
         await bot.send_message(
             chat_id=message.chat.id,
             text="🔍 Поиск завершен",
-            reply_markup=keyboard
+            reply_markup=BACK_TO_MAIN_KEYBOARD
         )
 
     except requests.RequestException as e:
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
+        # A real 404 returns None above: here the backend is down or timing out, the order may well exist
+        logger.error(f"Ошибка при поиске заказа: {e}", extra={'order_id': order_id})
         await bot.send_message(
             chat_id=message.chat.id,
-            text=f"❌ Заказ с ID {order_id} не найден.",
-            reply_markup=keyboard
-        )
-
-# Handle "Approve" / "Reject" button presses
-@router.callback_query(lambda c: c.data.startswith(('approve_', 'reject_')))
-async def handle_approval(callback_query: CallbackQuery, bot: Bot):
-    action, order_id = callback_query.data.split('_', 1)
-    status = "approved" if action == "approve" else "rejected"
-
-    try:
-        response = requests.patch(
-            f"{BACKEND_URL}{order_id}/",
-            json={'status': status},
-            headers={'Content-Type': 'application/json'}
+            text="⚠️ Сервер заказов недоступен, попробуйте позже.",
+            reply_markup=BACK_TO_MAIN_KEYBOARD
+        )
+
+# Handle "Approve" / "Reject" button presses: acknowledged at once, the backend is updated in the background
+@callback_router.handler(ApprovalCallback)
+async def handle_approval(callback_query: CallbackQuery, bot: Bot, callback_data: ApprovalCallback):
+    order_id = str(callback_data.order_id)
+    status = "approved" if callback_data.action == "approve" else "rejected"
+    message = callback_query.message
+    processing = None
+
+    async def reconcile(error):
+        # Never let the "processing" edit land after the final state
+        await asyncio.gather(processing, return_exceptions=True)
+        if error is None:
+            closed = await close_notifications(bot, order_id, status, callback_query.from_user.full_name)
+            if (message.chat.id, message.message_id) not in closed:
+                await bot.edit_message_reply_markup(chat_id=message.chat.id, message_id=message.message_id, reply_markup=None)
+            return
+        # Bring the buttons back so the admin can try again
+        await bot.edit_message_reply_markup(chat_id=message.chat.id, message_id=message.message_id, reply_markup=message.reply_markup)
+        await bot.send_message(
+            chat_id=message.chat.id,
+            text=f"❌ Не удалось изменить статус заказа {order_id} на «{status}». Попробуйте ещё раз.",
+            reply_to_message_id=message.message_id
         )
-        response.raise_for_status()
 
-        await bot.answer_callback_query(callback_query.id, f"✅ Статус изменён на: {status}")
-        await bot.edit_message_reply_markup(
-            chat_id=callback_query.message.chat.id,
-            message_id=callback_query.message.message_id,
-            reply_markup=None
-        )
-        if order_id in sent_order_ids:
-            sent_order_ids.remove(order_id)
-    except requests.RequestException as e:
-        error_msg = f"Ошибка обновления статуса: {str(e)} - Response: {e.response.text if e.response else 'No response'}"
-        print(error_msg)
-        await bot.answer_callback_query(callback_query.id, "❌ Ошибка при обновлении статуса")
-
-# Handlers for viewing orders by status with pagination
-@router.callback_query(lambda c: c.data.startswith(('view_approved_', 'view_rejected_', 'view_pending_', 'back_to_main')))
-async def handle_view_orders(callback_query: CallbackQuery, bot: Bot):
-    if callback_query.data == "back_to_main":
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📊 Статистика", callback_data="view_stats")],
-            [InlineKeyboardButton(text="📜 Одобренные", callback_data="view_approved_1")],
-            [InlineKeyboardButton(text="🚫 Отклонённые", callback_data="view_rejected_1")],
-            [InlineKeyboardButton(text="⏳ Ожидающие", callback_data="view_pending_1")],
-            [InlineKeyboardButton(text="🔍 Поиск по ID", callback_data="search_by_id")],
-            [InlineKeyboardButton(text="📱 Частые клиенты", callback_data="view_customers")],
-            [InlineKeyboardButton(text="📥 Скачать статистику", callback_data="download_stats")],
-            [InlineKeyboardButton(text="📅 Заказы за период", callback_data="select_period")],
-            [InlineKeyboardButton(text="📈 Топ товары", callback_data="top_products")],
-            [InlineKeyboardButton(text="💰 Финансовая сводка", callback_data="financial_summary")]
-        ])
-        await bot.edit_message_text(
-            chat_id=callback_query.message.chat.id,
-            message_id=callback_query.message.message_id,
-            text="👋 Добро пожаловать в админ-панель!\nВыберите действие:",
-            reply_markup=keyboard
-        )
+    if not start_status_change(order_id, status, reconcile):
+        await bot.answer_callback_query(callback_query.id, "⏳ Статус этого заказа уже обновляется")
+        return
+    processing = asyncio.create_task(bot.edit_message_reply_markup(
+        chat_id=message.chat.id,
+        message_id=message.message_id,
+        reply_markup=processing_keyboard(status)
+    ))
+    _carousel_orders.pop('pending', None)
+    _carousel_orders.pop(status, None)
+    await bot.answer_callback_query(callback_query.id, f"⏳ Меняем статус на: {status}")
+
+# Helper function to get orders for the carousel, reusing a recent list while browsing
+async def get_carousel_orders(status: str, refresh: bool = False):
+    cached = _carousel_orders.get(status)
+    if cached and not refresh and time.monotonic() - cached[0] < CAROUSEL_CACHE_TTL:
+        return cached[1]
+    orders = await backend.get_orders(status=status)
+    # The backend does not know about approvals still being sent yet
+    orders = [order for order in orders if not status_change_in_flight(order.id)]
+    _carousel_orders[status] = (time.monotonic(), orders)
+    return orders
+
+# Helper function to take an order out of a cached carousel list without refetching it
+def drop_from_carousel(status: str, order_id: str):
+    cached = _carousel_orders.get(status)
+    if cached:
+        _carousel_orders[status] = (cached[0], [order for order in cached[1] if str(order.id) != order_id])
+
+# Helper function to show one order in the carousel: edits the photo in place when possible
+async def show_carousel_order(bot: Bot, chat_id, status: str, index: int, message: Message = None, refresh: bool = False):
+    orders = await get_carousel_orders(status, refresh)
+    editable = message is not None and bool(message.photo)
+
+    if not orders:
+        text = f"❌ Нет заказов со статусом '{status}'."
+        if editable:
+            await bot.edit_message_caption(
+                chat_id=chat_id,
+                message_id=message.message_id,
+                caption=text,
+                reply_markup=CAROUSEL_CLOSE_KEYBOARD
+            )
+        else:
+            await bot.send_message(chat_id=chat_id, text=text, reply_markup=BACK_TO_MAIN_KEYBOARD)
         return
 
-    # Split the callback data correctly
-    parts = callback_query.data.split('_')
-    status = f"{parts[0]}_{parts[1]}"  # e.g., "view_approved"
-    page = int(parts[2])  # e.g., "1"
-
-    status_map = {
-        'view_approved': 'approved',
-        'view_rejected': 'rejected',
-        'view_pending': 'pending'
-    }
-    current_status = status_map[status]
+    index = max(0, min(index, len(orders) - 1))
+    order = orders[index]
+    order_id = str(order.id)
+    caption = order_caption(order, 'status')
+    keyboard = carousel_keyboard(status, index, len(orders), order_id)
 
     try:
-        response = requests.get(f"{BACKEND_URL}?status={current_status}")
-        response.raise_for_status()
-        orders = response.json()
+        media = await receipt_media(order)
+    except requests.RequestException as e:
+        logger.error(f"Ошибка при загрузке чека: {e} для Order ID: {order_id}", extra={'order_id': order_id})
+        media = None
 
-        if not orders:
-            await bot.edit_message_text(
-                chat_id=callback_query.message.chat.id,
-                message_id=callback_query.message.message_id,
-                text=f"❌ Нет заказов со статусом '{current_status}'.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-                ])
+    try:
+        if editable and media is not None:
+            sent = await bot.edit_message_media(
+                chat_id=chat_id,
+                message_id=message.message_id,
+                media=InputMediaPhoto(media=media, caption=caption),
+                reply_markup=keyboard
             )
-            return
-
-        total_pages = (len(orders) + ORDERS_PER_PAGE - 1) // ORDERS_PER_PAGE
-        start_idx = (page - 1) * ORDERS_PER_PAGE
-        end_idx = min(start_idx + ORDERS_PER_PAGE, len(orders))
-        current_orders = orders[start_idx:end_idx]
-
-        base_url = BACKEND_URL.replace('/api/orders/', '')
-        
-        for order in current_orders:
-            order_id = str(order['id'])
-            caption = (
-                f"📋 Заказ со статусом '{current_status}'\n\n"
-                f"🆔 ID: {order_id}\n"
-                f"👤 Имя: {order['name']}\n"
-                f"📅 Время: {format_timestamp(order['created_at'])}\n"
-                f"📱 Телефон: {order['phone']}\n"
-                f"📦 Товар: {order['product']}\n"
-                f"🔢 Количество: {order['quantity']}\n"
-                f"📝 Статус: {order['status']}\n"
-            )
-
-            keyboard_buttons = []
-            if current_status == 'pending':
-                keyboard_buttons.append([
-                    InlineKeyboardButton(text=f"✅ Одобрить {order_id}", callback_data=f"approve_{order_id}"),
-                    InlineKeyboardButton(text=f"❌ Отклонить {order_id}", callback_data=f"reject_{order_id}")
-                ])
-
-            receipt_url = order['receipt'] if order['receipt'].startswith('http') else f"{base_url}{order['receipt']}"
-
-            try:
-                receipt_response = requests.get(receipt_url)
-                receipt_response.raise_for_status()
-
-                receipt_file = BufferedInputFile(receipt_response.content, filename=f"receipt_{order_id}.jpg")
-                await bot.send_photo(
-                    chat_id=callback_query.message.chat.id,
-                    photo=receipt_file,
-                    caption=caption,
-                    reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons) if keyboard_buttons else None
-                )
-            except requests.RequestException as e:
-                print(f"Ошибка при загрузке чека: {e} для Order ID: {order_id}")
-                await bot.send_message(
-                    chat_id=callback_query.message.chat.id,
-                    text=f"{caption}\n❌ Ошибка: Не удалось загрузить чек.",
-                    reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons) if keyboard_buttons else None
-                )
-            except Exception as e:
-                print(f"Ошибка при отправке фото: {e} для Order ID: {order_id}")
-                await bot.send_message(
-                    chat_id=callback_query.message.chat.id,
-                    text=f"{caption}\n❌ Ошибка: Не удалось отправить чек.",
-                    reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons) if keyboard_buttons else None
-                )
-
-        # Add pagination buttons
-        pagination_buttons = []
-        if page > 1:
-            pagination_buttons.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"{status}_{page-1}"))
-        if page < total_pages:
-            pagination_buttons.append(InlineKeyboardButton(text="➡️ Вперед", callback_data=f"{status}_{page+1}"))
-        
-        if pagination_buttons:
-            keyboard_buttons = [pagination_buttons]
-            keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")])
-            await bot.send_message(
-                chat_id=callback_query.message.chat.id,
-                text=f"📄 Страница {page} из {total_pages}",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        elif editable:
+            # Keep the previous photo but make it clear the receipt is missing
+            sent = await bot.edit_message_caption(
+                chat_id=chat_id,
+                message_id=message.message_id,
+                caption=f"{caption}\n❌ Ошибка: Не удалось загрузить чек.",
+                reply_markup=keyboard
             )
+        elif media is not None:
+            sent = await bot.send_photo(chat_id=chat_id, photo=media, caption=caption, reply_markup=keyboard)
         else:
-            keyboard_buttons = [[InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]]
-            await bot.send_message(
-                chat_id=callback_query.message.chat.id,
-                text="📄 Конец списка",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+            sent = await bot.send_message(
+                chat_id=chat_id,
+                text=f"{caption}\n❌ Ошибка: Не удалось загрузить чек.",
+                reply_markup=keyboard
             )
+    except TelegramBadRequest as e:
+        # Re-rendering the same order after a refresh is not an error
+        if "message is not modified" not in str(e):
+            raise
+        return
+    remember_receipt(order_id, sent)
+
+# Handle the "Back" buttons leading to the main menu
+@callback_router.handler(MenuCallback, view="main")
+async def handle_back_to_main(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
+    await bot.edit_message_text(
+        chat_id=callback_query.message.chat.id,
+        message_id=callback_query.message.message_id,
+        text=MAIN_MENU_TEXT,
+        reply_markup=MAIN_MENU_KEYBOARD
+    )
+    await bot.answer_callback_query(callback_query.id)
+
+# Handlers for viewing orders by status
+@callback_router.handler(OrderListCallback)
+async def handle_view_orders(callback_query: CallbackQuery, bot: Bot, callback_data: OrderListCallback):
+    current_status = callback_data.status
+    page = callback_data.page
 
+    try:
+        # Open the carousel at the first order of the requested page
+        await show_carousel_order(
+            bot, callback_query.message.chat.id, current_status, (page - 1) * ORDERS_PER_PAGE, refresh=True
+        )
         await bot.answer_callback_query(callback_query.id)
     except requests.RequestException as e:
-        print(f"Ошибка при получении заказов: {e}")
+        logger.error(f"Ошибка при получении заказов: {e}")
         await bot.edit_message_text(
             chat_id=callback_query.message.chat.id,
             message_id=callback_query.message.message_id,
             text=f"❌ Ошибка при загрузке заказов со статусом '{current_status}'.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
+            reply_markup=BACK_TO_MAIN_KEYBOARD
         )
         await bot.answer_callback_query(callback_query.id)
 
+# Handle carousel navigation
+@callback_router.handler(CarouselCallback)
+async def handle_carousel(callback_query: CallbackQuery, bot: Bot, callback_data: CarouselCallback):
+    try:
+        await show_carousel_order(bot, callback_query.message.chat.id, callback_data.status, callback_data.index, callback_query.message)
+        await bot.answer_callback_query(callback_query.id)
+    except requests.RequestException as e:
+        logger.error(f"Ошибка при получении заказов: {e}")
+        await bot.answer_callback_query(callback_query.id, "❌ Ошибка при получении данных")
+
+# Handle inline approve/reject in the carousel
+@callback_router.handler(CarouselActionCallback)
+async def handle_carousel_action(callback_query: CallbackQuery, bot: Bot, callback_data: CarouselActionCallback):
+    chat_id = callback_query.message.chat.id
+    status, index, order_id = callback_data.status, callback_data.index, str(callback_data.order_id)
+    new_status = "approved" if callback_data.action == "approve" else "rejected"
+
+    async def reconcile(error):
+        if error is None:
+            await close_notifications(bot, order_id, new_status, callback_query.from_user.full_name)
+            return
+        # The carousel has moved on: report the failure and let the order come back into the list
+        _carousel_orders.pop(status, None)
+        await bot.send_message(
+            chat_id=chat_id,
+            text=f"❌ Не удалось изменить статус заказа {order_id} на «{new_status}». Заказ возвращён в список."
+        )
+
+    if not start_status_change(order_id, new_status, reconcile, previous=status):
+        await bot.answer_callback_query(callback_query.id, "⏳ Статус этого заказа уже обновляется")
+        return
+    drop_from_carousel(status, order_id)
+    _carousel_orders.pop(new_status, None)
+    await bot.answer_callback_query(callback_query.id, f"⏳ Меняем статус на: {new_status}")
+    try:
+        # The order leaves this list, so the same position now shows the next one
+        await show_carousel_order(bot, chat_id, status, index, callback_query.message)
+    except requests.RequestException as e:
+        logger.error(f"Ошибка при получении заказов: {e}")
+
+# Handle closing the carousel
+@callback_router.handler(CarouselCloseCallback)
+async def handle_carousel_close(callback_query: CallbackQuery, bot: Bot, callback_data: CarouselCloseCallback):
+    chat_id = callback_query.message.chat.id
+    await bot.delete_message(chat_id=chat_id, message_id=callback_query.message.message_id)
+    await bot.send_message(chat_id=chat_id, text=MAIN_MENU_TEXT, reply_markup=MAIN_MENU_KEYBOARD)
+    await bot.answer_callback_query(callback_query.id)
+
 # Handle frequent customers view
-@router.callback_query(lambda c: c.data == "view_customers")
-async def handle_customers(callback_query: CallbackQuery, bot: Bot):
+@callback_router.handler(MenuCallback, view="customers")
+async def handle_customers(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
     stats = await get_statistics()
     if not stats:
         await bot.answer_callback_query(callback_query.id, "Ошибка при получении данных")
@@ -1107,55 +629,46 @@ async def handle_customers(callback_query: CallbackQuery, bot: Bot):
     for i, (phone, orders) in enumerate(top_customers, 1):
         message += f"{i}. {phone}: {orders} заказов\n"
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-    ])
-
     await bot.edit_message_text(
         chat_id=callback_query.message.chat.id,
         message_id=callback_query.message.message_id,
         text=message,
-        reply_markup=keyboard
+        reply_markup=BACK_TO_MAIN_KEYBOARD
     )
     await bot.answer_callback_query(callback_query.id)
 
 # Handle Excel download
-@router.callback_query(lambda c: c.data == "download_stats")
-async def handle_download_stats(callback_query: CallbackQuery, bot: Bot):
+@callback_router.handler(MenuCallback, view="download")
+async def handle_download_stats(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
     await bot.answer_callback_query(callback_query.id, "⏳ Генерация файла...")
-    
-    excel_file = await generate_excel_file()
-    if not excel_file:
-        await bot.send_message(
-            chat_id=callback_query.message.chat.id,
-            text="❌ Ошибка при генерации файла статистики."
-        )
-        return
+    await queue_excel_export(bot, callback_query.message.chat.id)
 
-    # Send the Excel file
-    file = BufferedInputFile(
-        excel_file.getvalue(),
-        filename=f"statistics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    )
-    
-    await bot.send_document(
-        chat_id=callback_query.message.chat.id,
-        document=file,
-        caption="📊 Статистика заказов"
-    )
+# Handle period details download
+@callback_router.handler(PeriodDownloadCallback)
+async def handle_download_period(callback_query: CallbackQuery, bot: Bot, callback_data: PeriodDownloadCallback):
+    await bot.answer_callback_query(callback_query.id, "⏳ Генерация файла...")
+    await queue_period_export(bot, callback_query.message.chat.id, callback_data.period)
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-    ])
-    await bot.send_message(
-        chat_id=callback_query.message.chat.id,
-        text="✅ Файл статистики успешно сгенерирован",
-        reply_markup=keyboard
-    )
+# Handle cancel buttons of background jobs
+@callback_router.handler(JobCancelCallback)
+async def handle_job_cancel(callback_query: CallbackQuery, bot: Bot, callback_data: JobCancelCallback):
+    cancelled = await job_queue.cancel(bot, callback_data.job_id, callback_query.from_user.full_name)
+    await bot.answer_callback_query(callback_query.id, "🚫 Задача отменена" if cancelled else "Задача уже завершена")
+
+# Page counters and "processing" placeholders: only stop the button spinner
+@callback_router.handler(NoopCallback)
+async def handle_noop(callback_query: CallbackQuery, bot: Bot, callback_data: NoopCallback):
+    await bot.answer_callback_query(callback_query.id)
+
+# "Download details" of the finance and product views are not implemented yet
+@callback_router.handler(MenuCallback, view="download_finance")
+@callback_router.handler(MenuCallback, view="download_products")
+async def handle_unavailable(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
+    await bot.answer_callback_query(callback_query.id, "🚧 Выгрузка пока недоступна")
 
 # Handle statistics view
-@router.callback_query(lambda c: c.data == "view_stats")
-async def handle_statistics(callback_query: CallbackQuery, bot: Bot):
+@callback_router.handler(MenuCallback, view="stats")
+async def handle_statistics(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
     stats = await get_statistics()
     if not stats:
         await bot.answer_callback_query(callback_query.id, "Ошибка при получении статистики")
@@ -1174,341 +687,263 @@ async def handle_statistics(callback_query: CallbackQuery, bot: Bot):
     for product, quantity in sorted(stats['products'].items(), key=lambda x: x[1], reverse=True)[:5]:
         message += f"• {product}: {quantity} шт.\n"
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-    ])
-
     await bot.edit_message_text(
         chat_id=callback_query.message.chat.id,
         message_id=callback_query.message.message_id,
         text=message,
-        reply_markup=keyboard
+        reply_markup=BACK_TO_MAIN_KEYBOARD
     )
     await bot.answer_callback_query(callback_query.id)
 
-# Function to send order to Telegram admin
-async def send_order_to_admin(bot: Bot, order):
-    order_id = str(order['id'])
+# Function to send order to Telegram admin; returns False if it was already sent
+async def send_order_to_admin(bot: Bot, order) -> bool:
+    order_id = str(order.id)
     if order_id in sent_order_ids:
-        return
+        return False
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Одобрить", callback_data=f"approve_{order_id}")],
-        [InlineKeyboardButton(text="❌ Отклонить", callback_data=f"reject_{order_id}")]
-    ])
-
-    caption = (
-        f"🛒 Новый заказ!\n\n"
-        f"🆔 ID: {order_id}\n"
-        f"👤 Имя: {order['name']}\n"
-        f"📅 Время: {format_timestamp(order['created_at'])}\n"
-        f"📱 Телефон: {order['phone']}\n"
-        f"📦 Товар: {order['product']}\n"
-        f"🔢 Количество: {order['quantity']}\n"
-    )
-
-    base_url = BACKEND_URL.replace('/api/orders/', '')
-    receipt_url = order['receipt'] if order['receipt'].startswith('http') else f"{base_url}{order['receipt']}"
+    keyboard = approval_keyboard(order_id)
+    caption = order_caption(order, 'new')
+    # Admins often look the order up right after the notification
+    remember_order(order)
 
+    failure = None
     try:
-        receipt_response = requests.get(receipt_url)
-        receipt_response.raise_for_status()
-
-        receipt_file = BufferedInputFile(receipt_response.content, filename=f"receipt_{order_id}.jpg")
-        await bot.send_photo(
-            chat_id=ADMIN_CHAT_ID,
-            photo=receipt_file,
-            caption=caption,
-            reply_markup=keyboard
-        )
-        sent_order_ids.add(order_id)
+        media = await receipt_media(order)
     except requests.RequestException as e:
-        print(f"Ошибка при загрузке чека: {e} для Order ID: {order_id}")
-        await bot.send_message(
-            chat_id=ADMIN_CHAT_ID,
-            text=f"{caption}\n❌ Ошибка: Не удалось загрузить чек.",
-            reply_markup=keyboard
-        )
-        sent_order_ids.add(order_id)
+        logger.error(f"Ошибка при загрузке чека: {e} для Order ID: {order_id}", extra={'order_id': order_id})
+        media, failure = None, "Не удалось загрузить чек"
+
+    chats = notification_chats()
+    sent, errors = [], []
+    if isinstance(media, BufferedInputFile):
+        # Upload the receipt once; the other chats reuse the file_id Telegram assigned to it
+        while chats and not sent:
+            chat_id = chats.pop(0)
+            try:
+                message = await notify_chat(bot, chat_id, order_id, caption, keyboard, media, failure)
+            except Exception as e:
+                logger.warning(f"Не удалось уведомить чат {chat_id}: {e}", extra={'order_id': order_id})
+                errors.append(e)
+                continue
+            remember_receipt(order_id, message)
+            sent.append(message)
+        media = receipt_file_ids.get(order_id)
+        if media is None:
+            failure = failure or "Не удалось отправить чек"
+
+    results = await asyncio.gather(
+        *(notify_chat(bot, chat_id, order_id, caption, keyboard, media, failure) for chat_id in chats),
+        return_exceptions=True
+    )
+    for chat_id, result in zip(chats, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Не удалось уведомить чат {chat_id}: {result}", extra={'order_id': order_id})
+            errors.append(result)
+        else:
+            sent.append(result)
+    if not sent:
+        # Nobody got it: let the order checker retry on its next tick
+        raise errors[0]
+
+    order_notifications[order_id] = (caption, [(message.chat.id, message.message_id, bool(message.photo)) for message in sent])
+    if len(order_notifications) > NOTIFICATION_TRACK_SIZE:
+        order_notifications.popitem(last=False)
+    sent_order_ids.add(order_id)
+    return True
+
+# Announce a burst of new orders as one digest per chat: receipts album, order list, moderation entry point.
+# Returns the IDs of the orders it announced (those not sent before)
+async def send_order_digest(bot: Bot, orders) -> list:
+    orders = [order for order in orders if str(order.id) not in sent_order_ids]
+    if not orders:
+        return []
+    for order in orders:
+        remember_order(order)
+    text = digest_text(orders)
+    keyboard = digest_keyboard(len(orders))
+
+    album_orders = orders[:DIGEST_ALBUM_SIZE]
+    media = await asyncio.gather(*(receipt_media(order) for order in album_orders), return_exceptions=True)
+    album = []
+    for order, item in zip(album_orders, media):
+        if isinstance(item, Exception):
+            logger.error(f"Ошибка при загрузке чека: {item} для Order ID: {order.id}", extra={'order_id': str(order.id)})
+        else:
+            album.append((order, item))
+
+    chats = notification_chats()
+    delivered, errors = 0, []
+    if any(isinstance(item, BufferedInputFile) for _, item in album):
+        # Upload the receipts once; the other chats reuse their file_ids
+        while chats and not delivered:
+            chat_id = chats.pop(0)
+            try:
+                await send_digest_to_chat(bot, chat_id, album, text, keyboard)
+                delivered += 1
+            except Exception as e:
+                logger.warning(f"Не удалось уведомить чат {chat_id}: {e}")
+                errors.append(e)
+        album = [(order, receipt_file_ids.get(str(order.id))) for order, _ in album]
+        album = [(order, file_id) for order, file_id in album if file_id is not None]
+
+    results = await asyncio.gather(
+        *(send_digest_to_chat(bot, chat_id, album, text, keyboard) for chat_id in chats),
+        return_exceptions=True
+    )
+    for chat_id, result in zip(chats, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Не удалось уведомить чат {chat_id}: {result}")
+            errors.append(result)
+        else:
+            delivered += 1
+    if not delivered:
+        raise errors[0]
+    order_ids = [str(order.id) for order in orders]
+    sent_order_ids.update(order_ids)
+    return order_ids
+
+# Helper function to send a digest to one chat; a failed album does not hold back the order list
+async def send_digest_to_chat(bot: Bot, chat_id, album: list, text: str, keyboard):
+    try:
+        if len(album) > 1:
+            messages = await bot.send_media_group(
+                chat_id=chat_id,
+                media=[InputMediaPhoto(media=item, caption=f"🆔 {order.id}") for order, item in album]
+            )
+        elif album:
+            order, item = album[0]
+            messages = [await bot.send_photo(chat_id=chat_id, photo=item, caption=f"🆔 {order.id}")]
+        else:
+            messages = []
+        for (order, _), message in zip(album, messages):
+            remember_receipt(order.id, message)
+    except TelegramForbiddenError:
+        raise
     except Exception as e:
-        print(f"Ошибка при отправке фото: {e} для Order ID: {order_id}")
-        await bot.send_message(
-            chat_id=ADMIN_CHAT_ID,
-            text=f"{caption}\n❌ Ошибка: Не удалось отправить чек.",
-            reply_markup=keyboard
-        )
-        sent_order_ids.add(order_id)
+        logger.exception(f"Ошибка при отправке чеков: {e}")
+    return await bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard)
+
+# Chats notified about new orders: ADMIN_CHAT_ID first, the receipt is uploaded there
+def notification_chats() -> list:
+    admin_chat = int(ADMIN_CHAT_ID)
+    return [admin_chat] + sorted(ADMIN_IDS - {admin_chat})
+
+# Helper function to send one new-order notification, falling back to text without the receipt
+async def notify_chat(bot: Bot, chat_id, order_id: str, caption: str, keyboard, media, failure: str = None):
+    if media is not None:
+        try:
+            return await bot.send_photo(chat_id=chat_id, photo=media, caption=caption, reply_markup=keyboard)
+        except TelegramForbiddenError:
+            raise
+        except Exception as e:
+            logger.exception(f"Ошибка при отправке фото: {e} для Order ID: {order_id}", extra={'order_id': order_id})
+            failure = "Не удалось отправить чек"
+    return await bot.send_message(chat_id=chat_id, text=f"{caption}\n❌ Ошибка: {failure}.", reply_markup=keyboard)
+
+# Mark an order as handled in every admin chat it was announced in, returns the (chat_id, message_id) updated
+async def close_notifications(bot: Bot, order_id: str, status: str, admin_name: str) -> set:
+    sent_order_ids.discard(order_id)
+    caption, messages = order_notifications.pop(order_id, (None, []))
+    text = f"{caption}\n\n{STATUS_ICONS.get(status, '❔')} Статус: {status} ({admin_name})"
+
+    async def close(chat_id, message_id, is_photo):
+        if is_photo:
+            await bot.edit_message_caption(chat_id=chat_id, message_id=message_id, caption=text, reply_markup=None)
+        else:
+            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, reply_markup=None)
+
+    results = await asyncio.gather(*(close(*message) for message in messages), return_exceptions=True)
+    for (chat_id, _, _), result in zip(messages, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Не удалось обновить уведомление в чате {chat_id}: {result}", extra={'order_id': order_id})
+    return {(chat_id, message_id) for chat_id, message_id, _ in messages}
 
 # Handle period selection
-@router.callback_query(lambda c: c.data == "select_period")
-async def handle_period_selection(callback_query: CallbackQuery, bot: Bot):
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📅 Сегодня", callback_data="period_today")],
-        [InlineKeyboardButton(text="📅 Вчера", callback_data="period_yesterday")],
-        [InlineKeyboardButton(text="📅 Неделя", callback_data="period_week")],
-        [InlineKeyboardButton(text="📅 Месяц", callback_data="period_month")],
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-    ])
-    
+@callback_router.handler(MenuCallback, view="periods")
+async def handle_period_selection(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
     await bot.edit_message_text(
         chat_id=callback_query.message.chat.id,
         message_id=callback_query.message.message_id,
         text="Выберите период для просмотра заказов:",
-        reply_markup=keyboard
+        reply_markup=PERIOD_KEYBOARD
     )
 
 # Handle period selection
-@router.callback_query(lambda c: c.data.startswith("period_"))
-async def handle_period_orders(callback_query: CallbackQuery, bot: Bot):
-    period = callback_query.data.split("_")[1]
-    now = datetime.now()
-    
-    if period == "today":
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = now
-    elif period == "yesterday":
-        start_date = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == "week":
-        start_date = now - timedelta(days=7)
-        end_date = now
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-        end_date = now
-    
+@callback_router.handler(PeriodCallback)
+async def handle_period_orders(callback_query: CallbackQuery, bot: Bot, callback_data: PeriodCallback):
+    period = callback_data.period
+
     try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Filter orders by date
-        filtered_orders = []
-        for order in orders:
-            # Convert order date to naive datetime for comparison
-            order_date = datetime.fromisoformat(order['created_at'].replace('Z', '+00:00'))
-            order_date = order_date.replace(tzinfo=None)  # Make it naive
-            
-            if start_date <= order_date <= end_date:
-                filtered_orders.append(order)
-        
+        # Orders of the period, from the local mirror's created_at index
+        filtered_orders = await order_store.get_period_orders(period)
+
         if not filtered_orders:
             await bot.edit_message_text(
                 chat_id=callback_query.message.chat.id,
                 message_id=callback_query.message.message_id,
                 text=f"❌ Нет заказов за выбранный период.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="🔙 Назад", callback_data="select_period")]
-                ])
+                reply_markup=BACK_TO_PERIOD_KEYBOARD
             )
             return
-        
-        # Calculate statistics
-        total_orders = len(filtered_orders)
-        total_quantity = sum(order['quantity'] for order in filtered_orders)
-        total_revenue = sum(calculate_order_price_and_profit(order['product'], order['quantity'])[0] 
-                          for order in filtered_orders if order['status'] == 'approved')
-        total_profit = sum(calculate_order_price_and_profit(order['product'], order['quantity'])[1] 
-                         for order in filtered_orders if order['status'] == 'approved')
-        
-        # Group by product
-        product_stats = defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
-        for order in filtered_orders:
-            if order['status'] == 'approved':
-                price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-                product_stats[order['product']]['quantity'] += order['quantity']
-                product_stats[order['product']]['revenue'] += price
-                product_stats[order['product']]['profit'] += profit
-        
-        message = (
-            f"📊 Статистика за {period}:\n\n"
-            f"📦 Всего заказов: {total_orders}\n"
-            f"📦 Всего товаров: {total_quantity}\n"
-            f"💰 Выручка: {total_revenue:,.0f} сум\n"
-            f"💵 Прибыль: {total_profit:,.0f} сум\n\n"
-            "📈 Статистика по товарам:\n"
-        )
-        
-        # Add product statistics
-        for product, stats in product_stats.items():
-            message += (
-                f"📦 {product}:\n"
-                f"   • Количество: {stats['quantity']} шт.\n"
-                f"   • Выручка: {stats['revenue']:,.0f} сум\n"
-                f"   • Прибыль: {stats['profit']:,.0f} сум\n\n"
-            )
-        
-        # Show last 5 orders
-        message += "📋 Последние заказы:\n"
-        for order in filtered_orders[-5:]:
-            price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-            message += (
-                f"🆔 {order['id']} | "
-                f"📦 {order['product']} x{order['quantity']} | "
-                f"💰 {price:,.0f} сум | "
-                f"📝 {order['status']}\n"
-            )
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📥 Скачать детали", callback_data=f"download_period_{period}")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="select_period")]
-        ])
-        
+
+        summary = calculate_period_summary(filtered_orders)
+
         await bot.edit_message_text(
             chat_id=callback_query.message.chat.id,
             message_id=callback_query.message.message_id,
-            text=message,
-            reply_markup=keyboard
+            text=format_period_summary(period, summary, filtered_orders),
+            reply_markup=period_details_keyboard(period)
         )
-        
+
     except Exception as e:
-        print(f"Error handling period orders: {e}")
+        logger.exception(f"Error handling period orders: {e}")
         await bot.edit_message_text(
             chat_id=callback_query.message.chat.id,
             message_id=callback_query.message.message_id,
             text="❌ Ошибка при получении данных.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="select_period")]
-            ])
+            reply_markup=BACK_TO_PERIOD_KEYBOARD
         )
 
 # Handle financial summary
-@router.callback_query(lambda c: c.data == "financial_summary")
-async def handle_financial_summary(callback_query: CallbackQuery, bot: Bot):
+@callback_router.handler(MenuCallback, view="finance")
+async def handle_financial_summary(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
     try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Calculate financial metrics
-        total_revenue = 0
-        total_profit = 0
-        daily_revenue = defaultdict(int)
-        daily_profit = defaultdict(int)
-        product_stats = defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
-        
-        for order in orders:
-            if order['status'] == 'approved':
-                price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-                total_revenue += price
-                total_profit += profit
-                
-                # Group by date
-                date = datetime.fromisoformat(order['created_at'].replace('Z', '+00:00')).strftime('%Y-%m-%d')
-                daily_revenue[date] += price
-                daily_profit[date] += profit
-                
-                # Group by product
-                product_stats[order['product']]['quantity'] += order['quantity']
-                product_stats[order['product']]['revenue'] += price
-                product_stats[order['product']]['profit'] += profit
-        
-        # Calculate average daily revenue and profit
-        avg_daily_revenue = total_revenue / len(daily_revenue) if daily_revenue else 0
-        avg_daily_profit = total_profit / len(daily_profit) if daily_profit else 0
-        
-        message = (
-            "💰 Финансовая сводка:\n\n"
-            f"📈 Общая выручка: {total_revenue:,.0f} сум\n"
-            f"💵 Общая прибыль: {total_profit:,.0f} сум\n"
-            f"📊 Средняя дневная выручка: {avg_daily_revenue:,.0f} сум\n"
-            f"📊 Средняя дневная прибыль: {avg_daily_profit:,.0f} сум\n\n"
-            "📈 Статистика по товарам:\n"
-        )
-        
-        # Add product statistics
-        for product, stats in product_stats.items():
-            message += (
-                f"📦 {product}:\n"
-                f"   • Количество: {stats['quantity']} шт.\n"
-                f"   • Выручка: {stats['revenue']:,.0f} сум\n"
-                f"   • Прибыль: {stats['profit']:,.0f} сум\n\n"
-            )
-        
-        # Show last 7 days
-        message += "📅 Последние 7 дней:\n"
-        last_7_days = sorted(daily_revenue.items(), reverse=True)[:7]
-        for date, revenue in last_7_days:
-            profit = daily_profit[date]
-            message += (
-                f"📅 {date}: "
-                f"💰 {revenue:,.0f} сум | "
-                f"💵 {profit:,.0f} сум\n"
-            )
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📥 Скачать детали", callback_data="download_financial")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
-        
+        summary = await order_store.get_finance_summary()
+
         await bot.edit_message_text(
             chat_id=callback_query.message.chat.id,
             message_id=callback_query.message.message_id,
-            text=message,
-            reply_markup=keyboard
+            text=format_finance_summary(summary),
+            reply_markup=FINANCE_KEYBOARD
         )
-        
+
     except Exception as e:
-        print(f"Error handling financial summary: {e}")
+        logger.exception(f"Error handling financial summary: {e}")
         await bot.edit_message_text(
             chat_id=callback_query.message.chat.id,
             message_id=callback_query.message.message_id,
             text="❌ Ошибка при получении данных.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
+            reply_markup=BACK_TO_MAIN_KEYBOARD
         )
 
 # Handle top products
-@router.callback_query(lambda c: c.data == "top_products")
-async def handle_top_products(callback_query: CallbackQuery, bot: Bot):
+@callback_router.handler(MenuCallback, view="products")
+async def handle_top_products(callback_query: CallbackQuery, bot: Bot, callback_data: MenuCallback):
     try:
-        response = requests.get(BACKEND_URL)
-        response.raise_for_status()
-        orders = response.json()
-        
-        # Calculate product statistics
-        product_stats = defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
-        
-        for order in orders:
-            if order['status'] == 'approved':
-                price, profit = calculate_order_price_and_profit(order['product'], order['quantity'])
-                product_stats[order['product']]['quantity'] += order['quantity']
-                product_stats[order['product']]['revenue'] += price
-                product_stats[order['product']]['profit'] += profit
-        
-        # Sort by quantity
-        sorted_products = sorted(product_stats.items(), key=lambda x: x[1]['quantity'], reverse=True)
-        
-        message = "📈 Топ товаров:\n\n"
-        
-        for product, stats in sorted_products:
-            message += (
-                f"📦 {product}:\n"
-                f"   • Количество: {stats['quantity']} шт.\n"
-                f"   • Выручка: {stats['revenue']:,.0f} сум\n"
-                f"   • Прибыль: {stats['profit']:,.0f} сум\n"
-                f"   • Средняя цена: {stats['revenue']/stats['quantity']:,.0f} сум\n\n"
-            )
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📥 Скачать детали", callback_data="download_products")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-        ])
-        
+        product_stats = await order_store.get_product_stats()
+
         await bot.edit_message_text(
             chat_id=callback_query.message.chat.id,
             message_id=callback_query.message.message_id,
-            text=message,
-            reply_markup=keyboard
+            text=format_product_stats(product_stats),
+            reply_markup=PRODUCTS_KEYBOARD
         )
-        
+
     except Exception as e:
-        print(f"Error handling top products: {e}")
+        logger.exception(f"Error handling top products: {e}")
         await bot.edit_message_text(
             chat_id=callback_query.message.chat.id,
             message_id=callback_query.message.message_id,
             text="❌ Ошибка при получении данных.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
-            ])
-        )
\ No newline at end of file
+            reply_markup=BACK_TO_MAIN_KEYBOARD
+        )
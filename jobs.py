@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import time
+from aiogram.types.input_file import FSInputFile
+from config import JOB_WORKERS, JOB_QUEUE_SIZE, JOB_PROGRESS_INTERVAL, JOB_RESULTS_DIR, JOB_RESULT_TTL
+from metrics import JOBS
+from rendering import job_keyboard
+
+logger = logging.getLogger(__name__)
+
+# One queued or running task; every chat that asked for the same key is subscribed to it
+class Job:
+    def __init__(self, job_id: int, key: str, title: str, run):
+        self.id = job_id
+        self.key = key
+        self.title = title
+        self.run = run              # async run(progress) -> (BytesIO, filename), or None on failure
+        self.subscribers = []       # [chat_id, progress message_id] pairs
+        self.state = "⏳ В очереди"
+        self.task = None
+        self.cancelled_by = None
+        self.edited_at = 0.0
+
+    def text(self) -> str:
+        return f"{self.title}\n{self.state}"
+
+# In-process queue for heavy admin tasks: a bounded worker pool, deduplication by key,
+# progress shown by editing one message per chat, cancellation and stored results
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE,
+                 results_dir: str = JOB_RESULTS_DIR, result_ttl: float = JOB_RESULT_TTL):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.results_dir = results_dir
+        self.result_ttl = result_ttl
+        self._queue = None
+        self._worker_tasks = []
+        self._active = {}       # key -> queued or running job
+        self._by_id = {}        # job id -> job, for the cancel button
+        self._ids = itertools.count(1)
+        self._file_ids = {}     # stored result path -> Telegram file_id of its first upload
+
+    def _ensure_workers(self, bot):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queued)
+        if not self._worker_tasks:
+            self._worker_tasks = [
+                asyncio.create_task(self._worker(bot), name=f"job-worker-{i}") for i in range(self.workers)
+            ]
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    # Queue a job for a chat, join an identical one already queued, or send the stored result of an earlier one
+    async def submit(self, bot, chat_id, key: str, title: str, run):
+        self._ensure_workers(bot)
+        path = await asyncio.to_thread(self._stored_result, key)
+        if path is not None:
+            JOBS.inc(result="reused")
+            await self._send_file(bot, chat_id, path, title)
+            return None
+
+        job = self._active.get(key)
+        if job is not None:
+            JOBS.inc(result="joined")
+        elif self._queue.full():
+            await bot.send_message(chat_id=chat_id, text="❌ Очередь задач заполнена, попробуйте позже")
+            return None
+        else:
+            job = Job(next(self._ids), key, title, run)
+            self._active[key] = job
+            self._by_id[job.id] = job
+            self._queue.put_nowait(job)
+
+        # Subscribe before awaiting, so a job finishing meanwhile still delivers to this chat
+        subscriber = [chat_id, None]
+        job.subscribers.append(subscriber)
+        message = await bot.send_message(chat_id=chat_id, text=job.text(), reply_markup=job_keyboard(job.id))
+        subscriber[1] = message.message_id
+        return job
+
+    async def cancel(self, bot, job_id: int, admin_name: str) -> bool:
+        job = self._by_id.get(job_id)
+        if job is None or job.cancelled_by is not None:
+            return False
+        job.cancelled_by = admin_name
+        if job.task is not None:
+            job.task.cancel()
+        # A new identical request starts over instead of joining the cancelled job
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        JOBS.inc(result="cancelled")
+        await self._update(bot, job, f"🚫 Отменено ({admin_name})", final=True)
+        return True
+
+    async def _worker(self, bot):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.cancelled_by is None:
+                    await self._run(bot, job)
+            except Exception as e:
+                logger.exception(f"Job {job.key} failed: {e}")
+                JOBS.inc(result="failed")
+                await self._update(bot, job, "❌ Ошибка при выполнении задачи", final=True)
+            finally:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                self._by_id.pop(job.id, None)
+                self._queue.task_done()
+
+    async def _run(self, bot, job: Job):
+        async def progress(text: str):
+            await self._update(bot, job, f"⚙️ {text}")
+
+        started = time.perf_counter()
+        job.task = asyncio.create_task(job.run(progress))
+        await self._update(bot, job, "⚙️ Выполняется...", force=True)
+        try:
+            result = await job.task
+        except asyncio.CancelledError:
+            if job.cancelled_by is None:
+                raise  # The worker itself is being stopped
+            logger.info(f"Job {job.key} cancelled by {job.cancelled_by}")
+            return
+        if result is None:
+            JOBS.inc(result="failed")
+            await self._update(bot, job, "❌ Не удалось сформировать файл", final=True)
+            return
+
+        output, filename = result
+        path = await asyncio.to_thread(self._store_result, job.key, filename, output.getvalue())
+        for chat_id in dict.fromkeys(chat_id for chat_id, _ in job.subscribers):
+            await self._send_file(bot, chat_id, path, job.title)
+        JOBS.inc(result="done")
+        await self._update(bot, job, f"✅ Готово за {time.perf_counter() - started:.1f} с", final=True)
+
+    # Edit every subscriber's progress message; intermediate states at most every JOB_PROGRESS_INTERVAL
+    async def _update(self, bot, job: Job, state: str, final: bool = False, force: bool = False):
+        job.state = state
+        now = time.monotonic()
+        if not (final or force) and now - job.edited_at < JOB_PROGRESS_INTERVAL:
+            return
+        job.edited_at = now
+        keyboard = None if final else job_keyboard(job.id)
+        results = await asyncio.gather(*(
+            bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=job.text(), reply_markup=keyboard)
+            for chat_id, message_id in job.subscribers if message_id is not None
+        ), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.debug(f"Job progress edit failed: {result}")
+
+    async def _send_file(self, bot, chat_id, path: str, caption: str):
+        file_id = self._file_ids.get(path)
+        filename = os.path.basename(path).split("__", 1)[1]
+        message = await bot.send_document(
+            chat_id=chat_id,
+            document=file_id or FSInputFile(path, filename=filename),
+            caption=caption
+        )
+        if file_id is None and getattr(message, 'document', None):
+            self._file_ids[path] = message.document.file_id
+
+    # Stored results: <key hash>__<filename> in results_dir, dropped after result_ttl
+    def _key_prefix(self, key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()[:16] + "__"
+
+    def _stored_result(self, key: str):
+        if not os.path.isdir(self.results_dir):
+            return None
+        prefix = self._key_prefix(key)
+        found = None
+        for entry in os.scandir(self.results_dir):
+            if time.time() - entry.stat().st_mtime > self.result_ttl:
+                os.remove(entry.path)
+                self._file_ids.pop(entry.path, None)
+            elif entry.name.startswith(prefix):
+                found = entry.path
+        return found
+
+    def _store_result(self, key: str, filename: str, content: bytes) -> str:
+        os.makedirs(self.results_dir, exist_ok=True)
+        path = os.path.join(self.results_dir, self._key_prefix(key) + filename)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+job_queue = JobQueue()
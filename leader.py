@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from config import STATE_DB_PATH, LEADER_LEASE_TTL
+
+logger = logging.getLogger(__name__)
+
+NOTIFIED_RETENTION = 30 * 24 * 3600  # Forget notified order IDs after 30 days
+
+def connect(path: str = STATE_DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS leases ("
+        "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS notified_orders ("
+        "order_id TEXT PRIMARY KEY, notified_at REAL NOT NULL)"
+    )
+    return conn
+
+# Lease-based leader election: only the holder polls and sends notifications
+class LeaderLease:
+    def __init__(self, name: str = "order_checker", ttl: float = LEADER_LEASE_TTL, path: str = STATE_DB_PATH):
+        self.name = name
+        self.ttl = ttl
+        self.path = path
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.expires_at = 0.0
+        self._conn = None
+
+    @property
+    def renew_interval(self) -> float:
+        # Renew well before expiry so a single slow renewal does not lose the lease
+        return self.ttl / 4
+
+    @property
+    def is_leader(self) -> bool:
+        return time.time() < self.expires_at
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+        return self._conn
+
+    def try_acquire(self) -> bool:
+        db = self._db()
+        now = time.time()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+            if row is None or row[0] == self.holder or row[1] < now:
+                db.execute(
+                    "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at",
+                    (self.name, self.holder, now + self.ttl)
+                )
+                db.execute("COMMIT")
+                if not self.is_leader:
+                    logger.info(f"Acquired '{self.name}' lease as {self.holder}")
+                self.expires_at = now + self.ttl
+                return True
+            db.execute("COMMIT")
+        except sqlite3.Error as e:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            logger.error(f"Error renewing '{self.name}' lease: {e}")
+            return self.is_leader
+
+        if self.expires_at:
+            logger.warning(f"Lost '{self.name}' lease to {row[0]}")
+        self.expires_at = 0.0
+        return False
+
+    def release(self):
+        if not self.expires_at:
+            return
+        try:
+            self._db().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+            logger.info(f"Released '{self.name}' lease")
+        except sqlite3.Error as e:
+            logger.error(f"Error releasing '{self.name}' lease: {e}")
+        self.expires_at = 0.0
+
+    async def keep_alive(self):
+        # Background task: standby replicas keep trying, the leader keeps renewing
+        try:
+            while True:
+                await asyncio.to_thread(self.try_acquire)
+                await asyncio.sleep(self.renew_interval)
+        finally:
+            await asyncio.to_thread(self.release)
+
+# Order IDs already announced by any replica, so a new leader does not re-send them
+class NotificationLog:
+    def __init__(self, path: str = STATE_DB_PATH):
+        self.path = path
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+        return self._conn
+
+    def load(self) -> set:
+        db = self._db()
+        db.execute("DELETE FROM notified_orders WHERE notified_at < ?", (time.time() - NOTIFIED_RETENTION,))
+        return {row[0] for row in db.execute("SELECT order_id FROM notified_orders")}
+
+    def add(self, order_id):
+        self._db().execute(
+            "INSERT OR IGNORE INTO notified_orders (order_id, notified_at) VALUES (?, ?)",
+            (str(order_id), time.time())
+        )
+
+    def add_many(self, order_ids):
+        # One transaction for a whole digest
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT OR IGNORE INTO notified_orders (order_id, notified_at) VALUES (?, ?)",
+                [(str(order_id), now) for order_id in order_ids]
+            )
+            db.execute("COMMIT")
+        except sqlite3.Error:
+            db.execute("ROLLBACK")
+            raise
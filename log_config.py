@@ -0,0 +1,69 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from config import LOG_LEVEL, LOG_FORMAT
+
+# Request context attached to every record logged while an update is handled
+chat_id_var = ContextVar('chat_id', default=None)
+handler_var = ContextVar('handler', default=None)
+
+CONTEXT_FIELDS = ('order_id', 'chat_id', 'handler', 'duration')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Fills chat_id/handler from the update context; runs in the calling thread, before queueing
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        if getattr(record, 'chat_id', None) is None:
+            record.chat_id = chat_id_var.get()
+        if getattr(record, 'handler', None) is None:
+            record.handler = handler_var.get()
+        return True
+
+# One JSON object per line
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Render the traceback here (it cannot cross the queue) but keep the message itself unformatted
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+# Routes all logging through a queue; a listener thread formats and writes, off the event loop
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> logging.handlers.QueueListener:
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
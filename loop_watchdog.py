@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from config import WATCHDOG_ENABLED, WATCHDOG_THRESHOLD_MS
+from metrics import EVENT_LOOP_STALLS, EVENT_LOOP_STALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Detects event loop stalls: a heartbeat task ticks on the loop, a thread watches the ticks
+class EventLoopWatchdog:
+    def __init__(self, threshold_ms: int = WATCHDOG_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 5  # Heartbeat and check period
+        self.last_tick = time.monotonic()
+        self.stalled_since = None  # Set by the monitor thread while the loop is blocked
+        self._loop = None
+        self._loop_thread_id = None
+        self._heartbeat_task = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Must be called from the event loop thread
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Event loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            stalled_since = self.stalled_since
+            if stalled_since is not None:
+                # The loop is responsive again: record how long it was blocked
+                self.stalled_since = None
+                duration = now - stalled_since
+                EVENT_LOOP_STALL_SECONDS.observe(duration)
+                logger.warning(f"Event loop recovered after a {duration:.3f}s stall")
+            self.last_tick = now
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval):
+            silence = time.monotonic() - self.last_tick
+            # A healthy tick arrives every interval, so anything beyond that is blocking time
+            if self.stalled_since is None and silence - self.interval > self.threshold:
+                self.stalled_since = self.last_tick
+                EVENT_LOOP_STALLS.inc()
+                logger.warning(
+                    f"Event loop blocked for {silence * 1000:.0f} ms in {self._task_name()}:\n{self._loop_stack()}"
+                )
+
+    def _task_name(self) -> str:
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "a loop callback"
+        return f"task {task.get_name()} ({task.get_coro().__qualname__})"
+
+    def _loop_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return "<no stack>"
+        return "".join(traceback.format_stack(frame))
+
+# Starts the watchdog when enabled in config; returns it (or None when disabled)
+def start_watchdog():
+    if not WATCHDOG_ENABLED:
+        return None
+    watchdog = EventLoopWatchdog()
+    watchdog.start()
+    return watchdog
@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from aiohttp import web
+from config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+
+_registry = []
+
+# Label values escaped as the text exposition format requires: backslash, double quote, newline
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+# Minimal Prometheus-compatible metric types (no external dependency)
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in values]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self._values = {}
+        self._functions = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function, **labels):
+        # Value is computed at scrape time, e.g. the size of an in-memory set
+        with self._lock:
+            self._functions[tuple(sorted(labels.items()))] = function
+
+    def value(self, **labels):
+        key = tuple(sorted(labels.items()))
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key)
+
+    def _samples(self):
+        # Copy under the lock (worker threads update metrics), render and call the functions outside it
+        with self._lock:
+            values = list(self._values.items())
+            functions = list(self._functions.items())
+        samples = [f"{self.name}{_format_labels(key)} {value}" for key, value in values]
+        for key, function in functions:
+            try:
+                samples.append(f"{self.name}{_format_labels(key)} {function()}")
+            except Exception as e:
+                logger.error(f"Error computing gauge {self.name}: {e}")
+        return samples
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            values = [(key, list(state)) for key, state in self._values.items()]
+        samples = []
+        for key, state in values:
+            for bound, count in zip(self.buckets, state):
+                samples.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+            samples.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {state[-2]}")
+            samples.append(f"{self.name}_count{_format_labels(key)} {state[-2]}")
+            samples.append(f"{self.name}_sum{_format_labels(key)} {state[-1]}")
+        return samples
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+# Bot metrics
+HANDLER_LATENCY = Histogram("bot_handler_seconds", "Update handling latency by handler and command/callback")
+BACKEND_LATENCY = Histogram("bot_backend_request_seconds", "Backend request latency by endpoint")
+BACKEND_RESPONSES = Counter("bot_backend_responses_total", "Backend responses by endpoint and status code")
+RECEIPT_FETCH_SECONDS = Histogram("bot_receipt_fetch_seconds", "Receipt download duration")
+RECEIPT_FETCH_BYTES = Histogram("bot_receipt_fetch_bytes", "Receipt download size", buckets=BYTES_BUCKETS)
+POLL_LOOP_LAG = Histogram("bot_poll_loop_lag_seconds", "How late the order poll loop woke up")
+SEND_QUEUE_DEPTH = Gauge("bot_send_queue_depth", "New orders waiting to be sent to admins")
+DEDUP_SET_SIZE = Gauge("bot_dedup_set_size", "Order IDs held in notification dedup sets")
+CACHE_HIT_RATIO = Gauge("bot_cache_hit_ratio", "Hit ratio of in-memory caches")
+POLL_INTERVAL_SECONDS = Gauge("bot_poll_interval_seconds", "Current delay between order checks")
+POLL_CONSECUTIVE_FAILURES = Gauge("bot_poll_consecutive_failures", "Failed order checks in a row")
+POLL_LAST_SUCCESS = Gauge("bot_poll_last_success_timestamp_seconds", "Unix time of the last successful order check")
+POLL_CIRCUIT_OPEN = Gauge("bot_poll_circuit_open", "1 while order checks are paused by the open backend circuit")
+STATUS_UPDATES = Counter("bot_status_updates_total", "Background approve/reject PATCHes by result")
+JOBS = Counter("bot_jobs_total", "Background admin jobs by outcome")
+REJECTED_UPDATES = Counter("bot_rejected_updates_total", "Updates dropped before the handlers by reason")
+EVENT_LOOP_STALLS = Counter("bot_event_loop_stalls_total", "Event loop stalls detected by the watchdog")
+EVENT_LOOP_STALL_SECONDS = Histogram("bot_event_loop_stall_seconds", "Duration of detected event loop stalls")
+
+def hit_ratio(stats: dict) -> float:
+    total = stats['hits'] + stats['misses']
+    return round(stats['hits'] / total, 4) if total else 0.0
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+async def _handle_metrics(request):
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+# Starts the local /metrics endpoint; returns the runner (or None when disabled)
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,213 @@
+import cProfile
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+from config import (
+    SLOW_UPDATE_THRESHOLD, PROFILE_SAMPLE_RATE, PROFILER, PROFILE_DIR, PROFILE_KEEP,
+    ADMIN_IDS, THROTTLE_RATE, THROTTLE_BURST
+)
+from metrics import HANDLER_LATENCY, REJECTED_UPDATES
+from log_config import chat_id_var, handler_var
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyinstrument
+except ImportError:  # Optional: cProfile from the standard library is used otherwise
+    pyinstrument = None
+
+_profiling = False  # Only one profiler can be active in the process at a time
+
+# Label for an event: command name, or callback data without numeric parts
+def route_label(event) -> str:
+    data = getattr(event, 'data', None)
+    if data is not None:
+        separator = ':' if ':' in data else '_'  # Packed CallbackData payloads, or legacy "approve_123"
+        return separator.join(part for part in data.split(separator) if not part.isdigit()) or "callback"
+    text = getattr(event, 'text', None) or ""
+    if text.startswith('/'):
+        return text.split()[0].split('@')[0]
+    if text.isdigit():
+        return "search_by_id"
+    return "message"
+
+def chat_id_of(event):
+    chat = getattr(event, 'chat', None) or getattr(getattr(event, 'message', None), 'chat', None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, 'from_user', None)
+    return user.id if user is not None else None
+
+class _Profiler:
+    def __init__(self):
+        self.use_pyinstrument = PROFILER == "pyinstrument" and pyinstrument is not None
+        self.profiler = pyinstrument.Profiler(async_mode="enabled") if self.use_pyinstrument else cProfile.Profile()
+
+    def start(self):
+        if self.use_pyinstrument:
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.use_pyinstrument:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def save(self, name: str) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stem = os.path.join(PROFILE_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{name}")
+        if self.use_pyinstrument:
+            path = f"{stem}.html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.profiler.output_html())
+        else:
+            path = f"{stem}.prof"
+            self.profiler.dump_stats(path)
+        _rotate_profiles()
+        return path
+
+# Keep only the newest PROFILE_KEEP traces
+def _rotate_profiles():
+    files = sorted(
+        (os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR)),
+        key=os.path.getmtime
+    )
+    for path in files[:-PROFILE_KEEP]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# Outer middleware: times every update end to end and profiles a sample of them
+class TimingMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data):
+        global _profiling
+        timing = data['timing'] = {'handler': None}
+        profiler = None
+        if not _profiling and PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            _profiling = True
+            profiler = _Profiler()
+            profiler.start()
+
+        chat_token = chat_id_var.set(chat_id_of(event))
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            duration = time.perf_counter() - started
+            chat_id_var.reset(chat_token)
+            if profiler is not None:
+                profiler.stop()
+                _profiling = False
+            name = timing['handler'] or "unhandled"
+            # Only matched handlers label their route: arbitrary commands and stale buttons would add a series each
+            route = route_label(event) if timing['handler'] else "other"
+            HANDLER_LATENCY.observe(duration, handler=name, route=route)
+
+            if duration >= SLOW_UPDATE_THRESHOLD:
+                trace = ""
+                if profiler is not None:
+                    try:
+                        trace = f", trace saved to {profiler.save(name)}"
+                    except OSError as e:
+                        logger.error(f"Error saving profile: {e}")
+                logger.warning(
+                    f"Slow update: {name} ({route_label(event)}) took {duration:.3f}s{trace}",
+                    extra={'handler': name, 'duration': round(duration, 3), 'chat_id': chat_id_of(event)}
+                )
+
+# Inner middleware: records which handler was selected for the update
+class HandlerNameMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data):
+        handler_object = data.get('handler')
+        if handler_object is None:
+            return await handler(event, data)
+        name = handler_object.callback.__name__
+        if 'timing' in data:
+            data['timing']['handler'] = name
+        token = handler_var.set(name)
+        try:
+            return await handler(event, data)
+        finally:
+            handler_var.reset(token)
+
+# Token bucket per chat: `rate` updates per second on average, bursts of up to `burst`
+class TokenBucket:
+    __slots__ = ('tokens', 'updated_at', 'warned')
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.warned = False  # The chat was already told it is throttled
+
+    def take(self, rate: float, burst: float) -> bool:
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.warned = False
+            return True
+        return False
+
+# Outer middleware: rejects non-admins and throttles each chat before any handler runs.
+# Admins' button presses are not throttled: carousel and page browsing only edit one message, and
+# exports are deduplicated by the job queue; typed searches and commands are.
+class AccessMiddleware(BaseMiddleware):
+    MAX_BUCKETS = 10_000
+
+    def __init__(self, admin_ids=ADMIN_IDS, rate: float = THROTTLE_RATE, burst: float = THROTTLE_BURST):
+        self.admin_ids = admin_ids
+        self.rate = rate    # 0 disables throttling
+        self.burst = burst
+        self.buckets = {}
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            if len(self.buckets) >= self.MAX_BUCKETS:
+                # Drop buckets that have refilled completely, they carry no state
+                idle = self.burst / self.rate
+                now = time.monotonic()
+                self.buckets = {key: value for key, value in self.buckets.items() if now - value.updated_at < idle}
+            bucket = self.buckets[chat_id] = TokenBucket(self.burst)
+        return bucket
+
+    async def __call__(self, handler, event, data):
+        chat_id = chat_id_of(event)
+        user = getattr(event, 'from_user', None)
+        # Notifications go to ADMIN_CHAT_ID, which may be a group: admin chat or admin user both qualify
+        is_admin = chat_id in self.admin_ids or (user is not None and user.id in self.admin_ids)
+
+        throttled = self.rate and not (is_admin and isinstance(event, CallbackQuery))
+        if throttled and not self._bucket(chat_id).take(self.rate, self.burst):
+            REJECTED_UPDATES.inc(reason="throttled")
+            bucket = self.buckets[chat_id]
+            if is_admin and not bucket.warned:
+                bucket.warned = True
+                await _reply(event, "⏳ Слишком много запросов, подождите немного")
+            elif isinstance(event, CallbackQuery):
+                await event.answer()  # Stop the button spinner
+            return None
+
+        if not is_admin:
+            REJECTED_UPDATES.inc(reason="not_admin")
+            logger.warning(f"Rejected update from non-admin chat {chat_id}")
+            # Commands and buttons get an answer, other messages are ignored
+            if isinstance(event, CallbackQuery) or (getattr(event, 'text', None) or "").startswith('/'):
+                await _reply(event, "Вы не администратор!")
+            return None
+
+        return await handler(event, data)
+
+async def _reply(event, text: str):
+    if isinstance(event, CallbackQuery):
+        await event.answer(text)
+    elif isinstance(event, Message):
+        await event.answer(text)
@@ -0,0 +1,52 @@
+import json
+import sys
+from dataclasses import dataclass, fields
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard json module is used otherwise
+    orjson = None
+
+# Decode a JSON response body (bytes) with the fastest available decoder
+def loads(content: bytes):
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+# Order as returned by /api/orders/; slots keep the full history compact in memory
+@dataclass(slots=True)
+class Order:
+    id: int
+    name: str
+    phone: str
+    product: str
+    quantity: int
+    status: str
+    created_at: str
+    receipt: str = ""
+    updated_at: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Order":
+        # Products and statuses repeat across orders: share one string object each
+        return cls(
+            id=data['id'],
+            name=data['name'],
+            phone=data['phone'],
+            product=sys.intern(data['product']),
+            quantity=data['quantity'],
+            status=sys.intern(data['status']),
+            created_at=data['created_at'],
+            receipt=data.get('receipt') or "",
+            updated_at=data.get('updated_at'),
+        )
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in ORDER_FIELDS}
+
+ORDER_FIELDS = tuple(field.name for field in fields(Order))
+
+def decode_orders(content: bytes) -> list:
+    return [Order.from_dict(item) for item in loads(content)]
+
+def decode_order(content: bytes) -> Order:
+    return Order.from_dict(loads(content))
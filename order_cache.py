@@ -0,0 +1,53 @@
+import dataclasses
+import time
+from collections import OrderedDict
+import requests
+from backend import backend
+from config import ORDER_CACHE_TTL, ORDER_NOT_FOUND_TTL
+from metrics import CACHE_HIT_RATIO, hit_ratio
+
+ORDER_CACHE_SIZE = 2000  # Orders (and missing IDs) remembered for repeat lookups
+
+# Order ID -> (monotonic expiry, Order, or None for an ID the backend does not know)
+_orders = OrderedDict()
+order_cache_stats = {'hits': 0, 'misses': 0}
+CACHE_HIT_RATIO.set_function(lambda: hit_ratio(order_cache_stats), cache="order_lookup")
+
+def _key(order_id) -> str:
+    return str(order_id).lstrip('0') or '0'
+
+def _store(order_id, order, ttl: float):
+    key = _key(order_id)
+    _orders[key] = (time.monotonic() + ttl, order)
+    _orders.move_to_end(key)
+    if len(_orders) > ORDER_CACHE_SIZE:
+        _orders.popitem(last=False)
+
+# Returns the order, or None when the backend answers 404
+async def lookup_order(order_id):
+    cached = _orders.get(_key(order_id))
+    if cached is not None and cached[0] > time.monotonic():
+        order_cache_stats['hits'] += 1
+        return cached[1]
+
+    order_cache_stats['misses'] += 1
+    try:
+        order = await backend.get_order(order_id)
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise
+        _store(order_id, None, ORDER_NOT_FOUND_TTL)
+        return None
+    _store(order_id, order, ORDER_CACHE_TTL)
+    return order
+
+# Seed the cache with an order the bot already has (e.g. a fresh notification)
+def remember_order(order) -> None:
+    _store(order.id, order, ORDER_CACHE_TTL)
+
+# Write-through after a successful status update
+def update_cached_status(order_id, status: str) -> None:
+    cached = _orders.get(_key(order_id))
+    if cached is not None and cached[1] is not None:
+        # Replace rather than mutate: the cached Order may be shared with other views
+        _orders[_key(order_id)] = (cached[0], dataclasses.replace(cached[1], status=status))
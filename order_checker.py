@@ -1,46 +1,180 @@
 import asyncio
+import random
+import time
+from collections import deque
 import requests
-from handlers import send_order_to_admin
-from config import BACKEND_URL, NOTIFICATIONS_ENABLED
+from handlers import send_order_to_admin, send_order_digest
+from status_updates import status_change_in_flight
+from backend import backend
+from order_store import order_store
+from search_index import search_index
+from leader import LeaderLease, NotificationLog
+from metrics import (
+    POLL_LOOP_LAG, SEND_QUEUE_DEPTH, DEDUP_SET_SIZE,
+    POLL_INTERVAL_SECONDS, POLL_CONSECUTIVE_FAILURES, POLL_LAST_SUCCESS, POLL_CIRCUIT_OPEN
+)
+from config import (
+    NOTIFICATIONS_ENABLED, DIGEST_THRESHOLD, DIGEST_WINDOW, DIGEST_MAX_ORDERS,
+    POLL_INTERVAL, POLL_INTERVAL_MIN, POLL_INTERVAL_MAX, POLL_IDLE_GROWTH, POLL_ACTIVITY_WINDOW, POLL_BACKOFF_MAX
+)
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def check_orders_loop(bot):
+# Adaptive cadence for the order polling loop
+class PollScheduler:
+    def __init__(self, is_circuit_open=None):
+        self.current_interval = POLL_INTERVAL
+        self.consecutive_failures = 0
+        self.last_success_at = None     # time.time() of the last successful check
+        self.last_activity_at = None    # time.time() of the last check that found new orders
+        self.is_circuit_open = is_circuit_open or (lambda: False)
+
+    def record_success(self, new_orders: int):
+        now = time.time()
+        self.consecutive_failures = 0
+        self.last_success_at = now
+        if new_orders:
+            self.last_activity_at = now
+
+        if self.last_activity_at and now - self.last_activity_at < POLL_ACTIVITY_WINDOW:
+            # Orders are coming in: poll fast so the admin sees them quickly
+            self.current_interval = POLL_INTERVAL_MIN
+        else:
+            # Quiet period: gradually slow down towards the idle cadence
+            self.current_interval = min(
+                max(self.current_interval, POLL_INTERVAL) * POLL_IDLE_GROWTH,
+                POLL_INTERVAL_MAX
+            )
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        backoff = min(POLL_INTERVAL * 2 ** self.consecutive_failures, POLL_BACKOFF_MAX)
+        # Equal jitter keeps replicas from retrying in lockstep
+        self.current_interval = backoff / 2 + random.uniform(0, backoff / 2)
+
+    def next_delay(self) -> float:
+        if self.is_circuit_open():
+            # Backend is known to be down: do not poll until the circuit closes
+            return max(self.current_interval, POLL_INTERVAL)
+        return self.current_interval
+
+    def should_poll(self) -> bool:
+        return not self.is_circuit_open()
+
+    def status(self) -> dict:
+        return {
+            'current_interval': round(self.current_interval, 2),
+            'consecutive_failures': self.consecutive_failures,
+            'last_success_at': self.last_success_at,
+            'circuit_open': self.is_circuit_open(),
+        }
+
+poll_scheduler = PollScheduler(is_circuit_open=backend.circuit.is_open)
+# Scheduler state is read at scrape time
+POLL_INTERVAL_SECONDS.set_function(lambda: poll_scheduler.status()['current_interval'])
+POLL_CONSECUTIVE_FAILURES.set_function(lambda: poll_scheduler.status()['consecutive_failures'])
+POLL_LAST_SUCCESS.set_function(lambda: poll_scheduler.status()['last_success_at'] or 0)
+POLL_CIRCUIT_OPEN.set_function(lambda: int(poll_scheduler.status()['circuit_open']))
+
+# Switches notifications to digests while orders arrive faster than threshold per window
+class NotificationCoalescer:
+    def __init__(self, threshold: int = DIGEST_THRESHOLD, window: float = DIGEST_WINDOW):
+        self.threshold = threshold
+        self.window = window
+        self.announced = deque()  # time.monotonic() of each recently announced order
+
+    def is_burst(self, new_orders: int) -> bool:
+        now = time.monotonic()
+        while self.announced and now - self.announced[0] > self.window:
+            self.announced.popleft()
+        self.announced.extend([now] * new_orders)
+        return len(self.announced) > self.threshold
+
+# One polling tick: notify about pending orders not announced yet, returns how many were sent
+async def check_new_orders(bot, sent_orders: set, notified: NotificationLog, lease: LeaderLease,
+                           coalescer: NotificationCoalescer = None) -> int:
+    # Never act on stale snapshots here: a failed check must back off
+    orders = await backend.get_orders(status='pending', allow_stale=False)
+    # New orders always arrive as pending, so this keeps the local mirror current between full syncs.
+    # Orders being approved/rejected right now keep their new local status
+    await order_store.record_orders([order for order in orders if not status_change_in_flight(order.id)])
+    search_index.add_orders(orders)
+    pending = [order for order in orders if str(order.id) not in sent_orders]
+    SEND_QUEUE_DEPTH.set(len(pending))
+    if not pending or not lease.is_leader:
+        return 0
+
+    if coalescer is not None and coalescer.is_burst(len(pending)):
+        # A burst: one digest message per DIGEST_MAX_ORDERS orders instead of a photo each
+        batches = [pending[i:i + DIGEST_MAX_ORDERS] for i in range(0, len(pending), DIGEST_MAX_ORDERS)]
+        logger.info(f"Burst of {len(pending)} new orders, sending {len(batches)} digest(s)")
+    else:
+        batches = [[order] for order in pending]
+
+    new_orders = 0
+    for batch in batches:
+        if not lease.is_leader:
+            break
+        if len(batch) > 1:
+            announced = await send_order_digest(bot, batch)
+        else:
+            announced = [str(batch[0].id)] if await send_order_to_admin(bot, batch[0]) else []
+        # Orders this process had already announced are recorded too, but not counted as sent again
+        order_ids = [str(order.id) for order in batch]
+        sent_orders.update(order_ids)
+        await asyncio.to_thread(notified.add_many, order_ids)
+        new_orders += len(announced)
+        SEND_QUEUE_DEPTH.dec(len(batch))
+        for order_id in announced:
+            logger.info(f"Sent notification for new order #{order_id}", extra={'order_id': order_id})
+    DEDUP_SET_SIZE.set(len(sent_orders), set="order_checker")
+    return new_orders
+
+async def check_orders_loop(bot, scheduler: PollScheduler = poll_scheduler):
+    lease = LeaderLease()
+    notified = NotificationLog()
+    lease_task = asyncio.create_task(lease.keep_alive())
+    coalescer = NotificationCoalescer()
     sent_orders = set()
+    was_leader = False
     logger.info("Starting order monitoring loop")
 
-    while True:
-        try:
-            if NOTIFICATIONS_ENABLED:
-                logger.info("Checking for new orders...")
-                response = requests.get(f"{BACKEND_URL}?status=pending")
-                response.raise_for_status()
-
-                orders = response.json()
-                for order in orders:
-                    if order["id"] not in sent_orders:
-                        order_data = {
-                            'id': order['id'],
-                            'name': order['name'],
-                            'created_at': order['created_at'],
-                            'phone': order['phone'],
-                            'product': order['product'],
-                            'quantity': order['quantity'],
-                            'receipt': order['receipt']
-                        }
-                        await send_order_to_admin(bot, order_data)
-                        sent_orders.add(order['id'])
-                        logger.info(f"Sent notification for new order #{order['id']}")
-            else:
-                logger.info("Notifications are disabled, skipping order check")
-                
-        except requests.RequestException as e:
-            logger.error(f"Error getting orders: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error in order checker: {e}")
-
-        # Check every 10 seconds
-        await asyncio.sleep(10)
\ No newline at end of file
+    try:
+        while True:
+            if not lease.is_leader:
+                # Another replica polls and notifies; check again after the next renewal
+                if was_leader:
+                    logger.info("No longer the leader, pausing order checks")
+                was_leader = False
+                await asyncio.sleep(lease.renew_interval)
+                continue
+            if not was_leader:
+                logger.info("Elected leader, taking over order checks")
+                sent_orders = await asyncio.to_thread(notified.load)
+                was_leader = True
+
+            try:
+                if not NOTIFICATIONS_ENABLED:
+                    logger.info("Notifications are disabled, skipping order check")
+                elif not scheduler.should_poll():
+                    logger.info("Backend circuit is open, skipping order check")
+                else:
+                    logger.info("Checking for new orders...")
+                    new_orders = await check_new_orders(bot, sent_orders, notified, lease, coalescer)
+                    scheduler.record_success(new_orders)
+                    # Pick up status changes and deletions made outside the bot
+                    await order_store.refresh()
+
+            except requests.RequestException as e:
+                scheduler.record_failure()
+                logger.error(f"Error getting orders: {e} (retry in {scheduler.current_interval:.1f}s)")
+            except Exception as e:
+                logger.exception(f"Unexpected error in order checker: {e}")
+
+            delay = scheduler.next_delay()
+            sleep_started = time.monotonic()
+            await asyncio.sleep(delay)
+            POLL_LOOP_LAG.observe(max(time.monotonic() - sleep_started - delay, 0))
+    finally:
+        lease_task.cancel()
@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+import requests
+from analytics import parse_order_date, period_bounds, summarize_finance_days
+from backend import backend
+from config import ORDERS_DB_PATH, MIRROR_FULL_SYNC_INTERVAL
+from models import Order, ORDER_FIELDS
+from rendering import calculate_order_price_and_profit
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS orders ("
+    "id INTEGER PRIMARY KEY, name TEXT NOT NULL, phone TEXT NOT NULL, product TEXT NOT NULL, "
+    "quantity INTEGER NOT NULL, status TEXT NOT NULL, created_at TEXT NOT NULL, receipt TEXT NOT NULL, "
+    "updated_at TEXT, "
+    "created TEXT NOT NULL, "      # parse_order_date(created_at) as 'YYYY-MM-DD HH:MM:SS', used for ranges
+    "synced_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS orders_status ON orders (status, created)",
+    "CREATE INDEX IF NOT EXISTS orders_created ON orders (created)",
+    "CREATE INDEX IF NOT EXISTS orders_product ON orders (product)",
+    "CREATE INDEX IF NOT EXISTS orders_phone ON orders (phone)",
+    "CREATE TABLE IF NOT EXISTS mirror_meta (key TEXT PRIMARY KEY, value REAL NOT NULL)",
+    # Approved orders per closed day (before today) and product, for the finance views
+    "CREATE TABLE IF NOT EXISTS daily_rollup ("
+    "day TEXT NOT NULL, product TEXT NOT NULL, orders INTEGER NOT NULL, quantity INTEGER NOT NULL, "
+    "revenue INTEGER NOT NULL, profit INTEGER NOT NULL, PRIMARY KEY (day, product)) WITHOUT ROWID",
+    # Days whose rollup rows are outdated, filled by the triggers below and drained by update_rollup().
+    # No unique key: the upsert's ON CONFLICT would override an OR IGNORE inside the triggers
+    "CREATE TABLE IF NOT EXISTS rollup_dirty (day TEXT NOT NULL)",
+    "CREATE TRIGGER IF NOT EXISTS orders_rollup_insert AFTER INSERT ON orders WHEN new.status = 'approved' "
+    "BEGIN INSERT INTO rollup_dirty VALUES (substr(new.created, 1, 10)); END",
+    "CREATE TRIGGER IF NOT EXISTS orders_rollup_delete AFTER DELETE ON orders WHEN old.status = 'approved' "
+    "BEGIN INSERT INTO rollup_dirty VALUES (substr(old.created, 1, 10)); END",
+    "CREATE TRIGGER IF NOT EXISTS orders_rollup_update AFTER UPDATE ON orders "
+    "WHEN (old.status = 'approved' OR new.status = 'approved') AND (old.status IS NOT new.status "
+    "OR old.product IS NOT new.product OR old.quantity IS NOT new.quantity OR old.created IS NOT new.created) "
+    "BEGIN INSERT INTO rollup_dirty VALUES (substr(old.created, 1, 10)); "
+    "INSERT INTO rollup_dirty VALUES (substr(new.created, 1, 10)); END",
+    # Bumped on every change of exported order data: cached report results are keyed by it
+    "INSERT OR IGNORE INTO mirror_meta (key, value) VALUES ('revision', 0)",
+    "CREATE TRIGGER IF NOT EXISTS orders_revision_insert AFTER INSERT ON orders "
+    "BEGIN UPDATE mirror_meta SET value = value + 1 WHERE key = 'revision'; END",
+    "CREATE TRIGGER IF NOT EXISTS orders_revision_delete AFTER DELETE ON orders "
+    "BEGIN UPDATE mirror_meta SET value = value + 1 WHERE key = 'revision'; END",
+    "CREATE TRIGGER IF NOT EXISTS orders_revision_update AFTER UPDATE ON orders "
+    "WHEN " + " OR ".join(f"old.{name} IS NOT new.{name}" for name in ORDER_FIELDS[1:]) + " "
+    "BEGIN UPDATE mirror_meta SET value = value + 1 WHERE key = 'revision'; END",
+)
+COLUMNS = ", ".join(ORDER_FIELDS)
+UPSERT = (
+    f"INSERT INTO orders ({COLUMNS}, created, synced_at) VALUES ({', '.join('?' * (len(ORDER_FIELDS) + 2))}) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{name} = excluded.{name}" for name in ORDER_FIELDS[1:] + ('created', 'synced_at'))
+)
+
+def _sortable(created_at: str) -> str:
+    return parse_order_date(created_at).isoformat(sep=' ', timespec='seconds')
+
+def _to_order(row) -> Order:
+    order = Order(*row)
+    order.product = sys.intern(order.product)
+    order.status = sys.intern(order.status)
+    return order
+
+def _new_product_stats():
+    return defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'profit': 0})
+
+def _add_product(product_stats, product: str, quantity: int) -> tuple:
+    price, profit = calculate_order_price_and_profit(product, quantity)
+    product_stats[product]['quantity'] += quantity
+    product_stats[product]['revenue'] += price
+    product_stats[product]['profit'] += profit
+    return price, profit
+
+# Local SQLite (WAL) mirror of the backend's orders; analytics views query it instead of the backend
+class OrderStore:
+    def __init__(self, path: str = ORDERS_DB_PATH, full_sync_interval: float = MIRROR_FULL_SYNC_INTERVAL):
+        self.path = path
+        self.full_sync_interval = full_sync_interval
+        self._conn = None
+        self._lock = threading.Lock()  # One connection shared by worker threads
+        self._sync_lock = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._db().execute(sql, params).fetchall()
+
+    # Writes
+    def upsert(self, orders, full: bool = False):
+        now = time.time()
+        rows = [
+            tuple(getattr(order, name) for name in ORDER_FIELDS) + (_sortable(order.created_at), now)
+            for order in orders
+        ]
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(UPSERT, rows)
+                if full:
+                    # Orders missing from a full listing were deleted on the backend
+                    db.execute("DELETE FROM orders WHERE synced_at < ?", (now,))
+                    db.execute("INSERT OR REPLACE INTO mirror_meta (key, value) VALUES ('full_sync_at', ?)", (now,))
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+
+    def set_status(self, order_id, status: str):
+        with self._lock:
+            self._db().execute("UPDATE orders SET status = ? WHERE id = ?", (status, int(order_id)))
+
+    def revision(self) -> int:
+        rows = self._query("SELECT value FROM mirror_meta WHERE key = 'revision'")
+        return int(rows[0][0]) if rows else 0
+
+    def full_sync_at(self):
+        rows = self._query("SELECT value FROM mirror_meta WHERE key = 'full_sync_at'")
+        return rows[0][0] if rows else None
+
+    # Indexed queries returning the same shapes as the analytics helpers
+    def statistics(self) -> dict:
+        stats = {
+            'total': 0,
+            'approved': 0,
+            'rejected': 0,
+            'pending': 0,
+            'total_quantity': 0,
+            'products': defaultdict(int),
+            'customers': defaultdict(int)
+        }
+        for status, count, quantity in self._query("SELECT status, COUNT(*), SUM(quantity) FROM orders GROUP BY status"):
+            stats[status] = count
+            stats['total'] += count
+            stats['total_quantity'] += quantity
+        for product, quantity in self._query("SELECT product, SUM(quantity) FROM orders GROUP BY product"):
+            stats['products'][product] = quantity
+        for phone, count in self._query("SELECT phone, COUNT(*) FROM orders GROUP BY phone"):
+            stats['customers'][phone] = count
+        return stats
+
+    def product_stats(self) -> dict:
+        product_stats = _new_product_stats()
+        rows = self._query("SELECT product, SUM(quantity) FROM orders WHERE status = 'approved' GROUP BY product")
+        for product, quantity in rows:
+            _add_product(product_stats, product, quantity)
+        return product_stats
+
+    # Approved orders of [start, end) as (day, product, orders, quantity, revenue, profit) rows
+    def _day_rows(self, db, start: str, end: str) -> list:
+        rows = db.execute(
+            "SELECT substr(created, 1, 10) AS day, product, COUNT(*), SUM(quantity) FROM orders "
+            "WHERE status = 'approved' AND created >= ? AND created < ? GROUP BY day, product",
+            (start, end)
+        ).fetchall()
+        return [
+            (day, product, count, quantity) + calculate_order_price_and_profit(product, quantity)
+            for day, product, count, quantity in rows
+        ]
+
+    def update_rollup(self, today: date = None):
+        # Recompute days touched by writes since the last call and close off days that ended since then
+        today = today or date.today()
+        yesterday = today - timedelta(days=1)
+        with self._lock:
+            db = self._db()
+            rows = db.execute("SELECT value FROM mirror_meta WHERE key = 'rollup_closed_through'").fetchall()
+            closed_through = date.fromordinal(int(rows[0][0])) if rows else None
+            dirty = [row[0] for row in db.execute("SELECT DISTINCT day FROM rollup_dirty")]
+            if closed_through is None:
+                ranges = [("", today.isoformat())]  # First run: every day before today
+            else:
+                ranges = [
+                    (day, (date.fromisoformat(day) + timedelta(days=1)).isoformat())
+                    for day in dirty if day <= closed_through.isoformat()
+                ]
+                if closed_through < yesterday:
+                    ranges.append(((closed_through + timedelta(days=1)).isoformat(), today.isoformat()))
+            if not ranges and not dirty:
+                return
+
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for start, end in ranges:
+                    db.execute("DELETE FROM daily_rollup WHERE day >= ? AND day < ?", (start, end))
+                    db.executemany("INSERT INTO daily_rollup VALUES (?, ?, ?, ?, ?, ?)", self._day_rows(db, start, end))
+                # Dirty days from today on are read live from orders anyway
+                db.execute("DELETE FROM rollup_dirty")
+                db.execute(
+                    "INSERT OR REPLACE INTO mirror_meta (key, value) VALUES ('rollup_closed_through', ?)",
+                    (max(closed_through or yesterday, yesterday).toordinal(),)
+                )
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+
+    def finance_summary(self, today: date = None) -> dict:
+        # Closed days come from the rollup (days x products rows), today from the orders index
+        today = today or date.today()
+        self.update_rollup(today)
+        rows = self._query("SELECT day, product, quantity, revenue, profit FROM daily_rollup")
+        with self._lock:
+            live = self._day_rows(self._db(), today.isoformat(), "9999")
+        rows += [(day, product, quantity, revenue, profit) for day, product, _, quantity, revenue, profit in live]
+        return summarize_finance_days(rows, today)
+
+    def period_orders(self, period: str) -> list:
+        start_date, end_date = period_bounds(period)
+        rows = self._query(
+            f"SELECT {COLUMNS} FROM orders WHERE created BETWEEN ? AND ? ORDER BY created, id",
+            (start_date.isoformat(sep=' ', timespec='seconds'), end_date.isoformat(sep=' ', timespec='seconds'))
+        )
+        return [_to_order(row) for row in rows]
+
+    def orders(self, status: str = None) -> list:
+        if status:
+            rows = self._query(f"SELECT {COLUMNS} FROM orders WHERE status = ? ORDER BY id", (status,))
+        else:
+            rows = self._query(f"SELECT {COLUMNS} FROM orders ORDER BY id")
+        return [_to_order(row) for row in rows]
+
+    def orders_by_ids(self, order_ids) -> list:
+        order_ids = list(order_ids)
+        rows = self._query(
+            f"SELECT {COLUMNS} FROM orders WHERE id IN ({', '.join('?' * len(order_ids))})", tuple(order_ids)
+        )
+        by_id = {row[0]: _to_order(row) for row in rows}
+        return [by_id[order_id] for order_id in order_ids if order_id in by_id]
+
+    # Async API used by handlers and the order checker
+    async def sync_full(self):
+        orders = await backend.get_orders(allow_stale=False)
+        await asyncio.to_thread(self.upsert, orders, True)
+        logger.info(f"Order mirror synced: {len(orders)} orders")
+
+    async def refresh(self):
+        # Full sync when the mirror is older than full_sync_interval; serve it read-only if the backend is down
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+        async with self._sync_lock:
+            synced_at = await asyncio.to_thread(self.full_sync_at)
+            if synced_at is not None and time.time() - synced_at < self.full_sync_interval:
+                return
+            try:
+                await self.sync_full()
+            except requests.RequestException as e:
+                if synced_at is None:
+                    raise
+                logger.warning(f"Backend unavailable, serving order mirror from {time.ctime(synced_at)}: {e}")
+
+    async def get_statistics(self) -> dict:
+        await self.refresh()
+        return await asyncio.to_thread(self.statistics)
+
+    async def get_product_stats(self) -> dict:
+        await self.refresh()
+        return await asyncio.to_thread(self.product_stats)
+
+    async def get_finance_summary(self) -> dict:
+        await self.refresh()
+        return await asyncio.to_thread(self.finance_summary)
+
+    async def get_period_orders(self, period: str) -> list:
+        await self.refresh()
+        return await asyncio.to_thread(self.period_orders, period)
+
+    async def get_orders(self, status: str = None) -> list:
+        await self.refresh()
+        return await asyncio.to_thread(self.orders, status)
+
+    async def get_revision(self) -> int:
+        await self.refresh()
+        return await asyncio.to_thread(self.revision)
+
+    async def get_orders_by_ids(self, order_ids) -> list:
+        # Keeps the order of order_ids; no refresh, callers already hold fresh IDs
+        return await asyncio.to_thread(self.orders_by_ids, order_ids)
+
+    async def record_orders(self, orders):
+        # Incremental sync from the poller's pending list
+        await asyncio.to_thread(self.upsert, orders)
+
+    async def record_status(self, order_id, status: str):
+        # Write-through after a successful status update on the backend
+        await asyncio.to_thread(self.set_status, order_id, status)
+
+order_store = OrderStore()
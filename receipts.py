@@ -0,0 +1,34 @@
+from collections import OrderedDict
+from aiogram.types import Message
+from aiogram.types.input_file import BufferedInputFile
+from backend import backend
+from metrics import CACHE_HIT_RATIO, hit_ratio
+
+RECEIPT_CACHE_SIZE = 5000  # Telegram file_ids remembered for already uploaded receipts
+
+# Order ID -> Telegram file_id of the uploaded receipt photo
+receipt_file_ids = OrderedDict()
+receipt_cache_stats = {'hits': 0, 'misses': 0}
+CACHE_HIT_RATIO.set_function(lambda: hit_ratio(receipt_cache_stats), cache="receipt_file_id")
+
+# Returns a cached file_id, or downloads the receipt for a first upload
+async def receipt_media(order):
+    order_id = str(order.id)
+    file_id = receipt_file_ids.get(order_id)
+    if file_id is not None:
+        receipt_file_ids.move_to_end(order_id)
+        receipt_cache_stats['hits'] += 1
+        return file_id
+
+    receipt_cache_stats['misses'] += 1
+    receipt_bytes = await backend.fetch_receipt(order.receipt)
+    return BufferedInputFile(receipt_bytes, filename=f"receipt_{order_id}.jpg")
+
+# Remember the file_id Telegram assigned to an uploaded receipt
+def remember_receipt(order_id, message) -> None:
+    if not isinstance(message, Message) or not message.photo:
+        return
+    receipt_file_ids[str(order_id)] = message.photo[-1].file_id
+    receipt_file_ids.move_to_end(str(order_id))
+    if len(receipt_file_ids) > RECEIPT_CACHE_SIZE:
+        receipt_file_ids.popitem(last=False)
@@ -0,0 +1,253 @@
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from metrics import CACHE_HIT_RATIO, hit_ratio
+from callbacks import (
+    MenuCallback, OrderListCallback, ApprovalCallback, CarouselCallback, CarouselActionCallback,
+    CarouselCloseCallback, PeriodCallback, PeriodDownloadCallback, FindPageCallback, JobCancelCallback, NoopCallback
+)
+
+CAPTION_CACHE_SIZE = 2048  # Rendered captions kept in memory
+BACK_TO_MAIN = MenuCallback(view="main").pack()
+NOOP = NoopCallback().pack()  # Page counters and other inert buttons
+
+# Helper function to format timestamp
+def format_timestamp(timestamp: str) -> str:
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return dt.strftime('%d.%m.%Y %H:%M:%S')
+    except ValueError:
+        return timestamp
+
+# Helper function to format timestamp without seconds (compact lists)
+def format_short_timestamp(timestamp: str) -> str:
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return dt.strftime('%d.%m.%Y %H:%M')
+    except ValueError:
+        return timestamp
+
+# Helper function to calculate order price and profit
+def calculate_order_price_and_profit(product: str, quantity: int) -> tuple:
+    prices = {
+        'Ortacha gulqand': 40000,  # Средний Гулканд
+        'Katta gulqand': 50000     # Большой Гулканд
+    }
+    costs = {
+        'Ortacha gulqand': 20000,  # Себестоимость среднего
+        'Katta gulqand': 25000     # Себестоимость большого
+    }
+    price = prices.get(product, 0) * quantity
+    cost = costs.get(product, 0) * quantity
+    profit = price - cost
+    return price, profit
+
+# Static keyboards, built once at import time
+BACK_TO_MAIN_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔙 Назад", callback_data=BACK_TO_MAIN)]
+])
+
+BACK_TO_PERIOD_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔙 Назад", callback_data=MenuCallback(view="periods").pack())]
+])
+
+MAIN_MENU_TEXT = "👋 Добро пожаловать в админ-панель!\nВыберите действие:"
+
+MAIN_MENU_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📊 Статистика", callback_data=MenuCallback(view="stats").pack())],
+    [InlineKeyboardButton(text="📜 Одобренные", callback_data=OrderListCallback(status="approved", page=1).pack())],
+    [InlineKeyboardButton(text="🚫 Отклонённые", callback_data=OrderListCallback(status="rejected", page=1).pack())],
+    [InlineKeyboardButton(text="⏳ Ожидающие", callback_data=OrderListCallback(status="pending", page=1).pack())],
+    [InlineKeyboardButton(text="🔍 Поиск по ID", callback_data=MenuCallback(view="search").pack())],
+    [InlineKeyboardButton(text="📱 Частые клиенты", callback_data=MenuCallback(view="customers").pack())],
+    [InlineKeyboardButton(text="📥 Скачать статистику", callback_data=MenuCallback(view="download").pack())],
+    [InlineKeyboardButton(text="📅 Заказы за период", callback_data=MenuCallback(view="periods").pack())],
+    [InlineKeyboardButton(text="📈 Топ товары", callback_data=MenuCallback(view="products").pack())],
+    [InlineKeyboardButton(text="💰 Финансовая сводка", callback_data=MenuCallback(view="finance").pack())]
+])
+
+ORDERS_MENU_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📜 Одобренные", callback_data=OrderListCallback(status="approved", page=1).pack())],
+    [InlineKeyboardButton(text="🚫 Отклонённые", callback_data=OrderListCallback(status="rejected", page=1).pack())],
+    [InlineKeyboardButton(text="⏳ Ожидающие", callback_data=OrderListCallback(status="pending", page=1).pack())]
+])
+
+PERIOD_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📅 Сегодня", callback_data=PeriodCallback(period="today").pack())],
+    [InlineKeyboardButton(text="📅 Вчера", callback_data=PeriodCallback(period="yesterday").pack())],
+    [InlineKeyboardButton(text="📅 Неделя", callback_data=PeriodCallback(period="week").pack())],
+    [InlineKeyboardButton(text="📅 Месяц", callback_data=PeriodCallback(period="month").pack())],
+    [InlineKeyboardButton(text="🔙 Назад", callback_data=BACK_TO_MAIN)]
+])
+
+FINANCE_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📥 Скачать детали", callback_data=MenuCallback(view="download_finance").pack())],
+    [InlineKeyboardButton(text="🔙 Назад", callback_data=BACK_TO_MAIN)]
+])
+
+PRODUCTS_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📥 Скачать детали", callback_data=MenuCallback(view="download_products").pack())],
+    [InlineKeyboardButton(text="🔙 Назад", callback_data=BACK_TO_MAIN)]
+])
+
+# Approve/reject buttons: one column for new-order notifications, one row with IDs in lists
+@lru_cache(maxsize=1024)
+def approval_keyboard(order_id: str, inline: bool = False) -> InlineKeyboardMarkup:
+    if inline:
+        return InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text=f"✅ Одобрить {order_id}", callback_data=ApprovalCallback(action="approve", order_id=order_id).pack()),
+            InlineKeyboardButton(text=f"❌ Отклонить {order_id}", callback_data=ApprovalCallback(action="reject", order_id=order_id).pack())
+        ]])
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✅ Одобрить", callback_data=ApprovalCallback(action="approve", order_id=order_id).pack())],
+        [InlineKeyboardButton(text="❌ Отклонить", callback_data=ApprovalCallback(action="reject", order_id=order_id).pack())]
+    ])
+
+# Shown instead of the approve/reject buttons while the status change is being sent
+@lru_cache(maxsize=8)
+def processing_keyboard(status: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"⏳ {status}: обработка...", callback_data=NOOP)]
+    ])
+
+@lru_cache(maxsize=64)
+def period_details_keyboard(period: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📥 Скачать детали", callback_data=PeriodDownloadCallback(period=period).pack())],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data=MenuCallback(view="periods").pack())]
+    ])
+
+STATUS_ICONS = {'pending': '⏳', 'approved': '✅', 'rejected': '❌'}
+
+# Caption cache keyed by (order id, version, view kind)
+_caption_cache = OrderedDict()
+caption_cache_stats = {'hits': 0, 'misses': 0}
+CACHE_HIT_RATIO.set_function(lambda: hit_ratio(caption_cache_stats), cache="caption")
+
+def order_version(order) -> tuple:
+    # Captions only change when the order itself changes
+    return (order.status, order.updated_at)
+
+# Single place that lists the order fields shown to admins
+def _order_details(order, with_status: bool) -> str:
+    details = (
+        f"🆔 ID: {order.id}\n"
+        f"👤 Имя: {order.name}\n"
+        f"📅 Время: {format_timestamp(order.created_at)}\n"
+        f"📱 Телефон: {order.phone}\n"
+        f"📦 Товар: {order.product}\n"
+        f"🔢 Количество: {order.quantity}\n"
+    )
+    if with_status:
+        details += f"📝 Статус: {order.status}\n"
+    return details
+
+def _render_caption(order, kind: str) -> str:
+    if kind == 'new':
+        return "🛒 Новый заказ!\n\n" + _order_details(order, with_status=False)
+    if kind == 'search':
+        return f"🔍 Результаты поиска по ID: {order.id}\n\n" + _order_details(order, with_status=True)
+    if kind == 'status':
+        return f"📋 Заказ со статусом '{order.status}'\n\n" + _order_details(order, with_status=True)
+    if kind == 'line':
+        price, _ = calculate_order_price_and_profit(order.product, order.quantity)
+        return (
+            f"🆔 {order.id}\n"
+            f"👤 {order.name}\n"
+            f"📱 {order.phone}\n"
+            f"📦 {order.product} x{order.quantity}\n"
+            f"💰 {price:,.0f} сум\n"
+            f"📅 {format_short_timestamp(order.created_at)}\n\n"
+        )
+    if kind == 'short':
+        return (
+            f"{STATUS_ICONS.get(order.status, '❔')} 🆔 {order.id} | {order.name} | {order.phone}\n"
+            f"    📦 {order.product} x{order.quantity} | 📅 {format_short_timestamp(order.created_at)}\n"
+        )
+    raise ValueError(f"Unknown caption kind: {kind}")
+
+def order_caption(order, kind: str) -> str:
+    key = (str(order.id), order_version(order), kind)
+    caption = _caption_cache.get(key)
+    if caption is not None:
+        _caption_cache.move_to_end(key)
+        caption_cache_stats['hits'] += 1
+        return caption
+
+    caption_cache_stats['misses'] += 1
+    caption = _render_caption(order, kind)
+    _caption_cache[key] = caption
+    if len(_caption_cache) > CAPTION_CACHE_SIZE:
+        _caption_cache.popitem(last=False)
+    return caption
+
+# Text block for one page of a status list (/pending, /approved, /rejected)
+def order_list_text(title: str, orders, page: int) -> str:
+    return f"📋 {title} (страница {page}):\n\n" + "".join(order_caption(order, 'line') for order in orders)
+
+FIND_PAGE_SIZE = 10  # /find results per page
+
+# Text of one page of /find results
+def find_results_text(query: str, orders, page: int, pages: int, total: int) -> str:
+    header = f"🔎 «{query}»: найдено {total} (страница {page}/{pages})\n\n"
+    return header + "".join(order_caption(order, 'short') for order in orders) + "\nОткрыть заказ: отправьте его ID"
+
+@lru_cache(maxsize=256)
+def find_keyboard(page: int, pages: int) -> InlineKeyboardMarkup:
+    nav = []
+    if page > 1:
+        nav.append(InlineKeyboardButton(text="⬅️", callback_data=FindPageCallback(page=page - 1).pack()))
+    nav.append(InlineKeyboardButton(text=f"{page}/{pages}", callback_data=NOOP))
+    if page < pages:
+        nav.append(InlineKeyboardButton(text="➡️", callback_data=FindPageCallback(page=page + 1).pack()))
+    return InlineKeyboardMarkup(inline_keyboard=[nav, [InlineKeyboardButton(text="🔙 Назад", callback_data=BACK_TO_MAIN)]])
+
+# Text of a burst digest: one compact line per new order
+def digest_text(orders) -> str:
+    total = sum(calculate_order_price_and_profit(order.product, order.quantity)[0] for order in orders)
+    return (
+        f"🛒 Новые заказы: {len(orders)} (на {total:,.0f} сум)\n\n"
+        + "".join(order_caption(order, 'short') for order in orders)
+    )
+
+@lru_cache(maxsize=64)
+def digest_keyboard(count: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"🗂 Модерировать ({count})", callback_data=CarouselCallback(status="pending", index=0).pack())]
+    ])
+
+@lru_cache(maxsize=64)
+def job_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🚫 Отменить", callback_data=JobCancelCallback(job_id=job_id).pack())]
+    ])
+
+CAROUSEL_JUMP = 5  # Orders skipped by the ⏪/⏩ buttons
+
+CAROUSEL_CLOSE_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔙 Назад", callback_data=CarouselCloseCallback().pack())]
+])
+
+# Navigation for the single-message order browser
+@lru_cache(maxsize=4096)
+def carousel_keyboard(status: str, index: int, total: int, order_id: str) -> InlineKeyboardMarkup:
+    nav = []
+    if index >= CAROUSEL_JUMP:
+        nav.append(InlineKeyboardButton(text="⏪", callback_data=CarouselCallback(status=status, index=index - CAROUSEL_JUMP).pack()))
+    if index > 0:
+        nav.append(InlineKeyboardButton(text="⬅️", callback_data=CarouselCallback(status=status, index=index - 1).pack()))
+    nav.append(InlineKeyboardButton(text=f"{index + 1}/{total}", callback_data=NOOP))
+    if index < total - 1:
+        nav.append(InlineKeyboardButton(text="➡️", callback_data=CarouselCallback(status=status, index=index + 1).pack()))
+    if index + CAROUSEL_JUMP < total:
+        nav.append(InlineKeyboardButton(text="⏩", callback_data=CarouselCallback(status=status, index=index + CAROUSEL_JUMP).pack()))
+
+    rows = [nav]
+    if status == 'pending':
+        rows.append([
+            InlineKeyboardButton(text="✅ Одобрить", callback_data=CarouselActionCallback(action="approve", status=status, index=index, order_id=order_id).pack()),
+            InlineKeyboardButton(text="❌ Отклонить", callback_data=CarouselActionCallback(action="reject", status=status, index=index, order_id=order_id).pack())
+        ])
+    rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data=CarouselCloseCallback().pack())])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -0,0 +1,286 @@
+# Excel reports. Imported lazily by handlers: pandas and openpyxl are only needed for downloads
+import asyncio
+import io
+import logging
+import pandas as pd
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.chart import BarChart, Reference, PieChart
+from openpyxl.utils import get_column_letter
+from openpyxl.chart.label import DataLabelList
+from order_store import order_store
+from rendering import calculate_order_price_and_profit
+
+logger = logging.getLogger(__name__)
+
+# Helper function to apply styles to worksheet
+def apply_styles(worksheet, title, data_start_row=2):
+    # Define styles
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")  # Dark blue
+    title_font = Font(bold=True, size=14, color="1F4E78")  # Dark blue
+    title_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")  # Light blue
+    data_font = Font(size=11)
+    border = Border(
+        left=Side(style='thin', color='B4C6E7'),
+        right=Side(style='thin', color='B4C6E7'),
+        top=Side(style='thin', color='B4C6E7'),
+        bottom=Side(style='thin', color='B4C6E7')
+    )
+    center_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    left_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    right_alignment = Alignment(horizontal='right', vertical='center', wrap_text=True)
+
+    # Apply title
+    title_cell = worksheet.cell(row=1, column=1, value=title)
+    title_cell.font = title_font
+    title_cell.fill = title_fill
+    title_cell.alignment = center_alignment
+    worksheet.merge_cells(start_row=1, start_column=1, end_row=1, end_column=worksheet.max_column)
+
+    # Apply header styles
+    for cell in worksheet[data_start_row]:
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center_alignment
+        cell.border = border
+
+    # Apply data styles
+    for row in worksheet.iter_rows(min_row=data_start_row + 1, max_row=worksheet.max_row):
+        for cell in row:
+            cell.font = data_font
+            cell.border = border
+            # Align numbers to the right, text to the left
+            if isinstance(cell.value, (int, float)):
+                cell.alignment = right_alignment
+            else:
+                cell.alignment = left_alignment
+
+    # Auto-adjust column widths with some padding
+    for column in worksheet.columns:
+        max_length = 0
+        column = [cell for cell in column]
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = (max_length + 4)  # Add more padding
+        worksheet.column_dimensions[get_column_letter(column[0].column)].width = adjusted_width
+
+    # Freeze the header row
+    worksheet.freeze_panes = f"A{data_start_row + 1}"
+
+# Helper function to build the orders table shared by all exports
+def orders_frame(orders):
+    df = pd.DataFrame([order.to_dict() for order in orders])
+
+    # Convert timestamp to readable format
+    df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%d.%m.%Y %H:%M:%S')
+
+    # Calculate price and profit for each order
+    df[['price', 'profit']] = df.apply(
+        lambda x: pd.Series(calculate_order_price_and_profit(x['product'], x['quantity'])), 
+        axis=1
+    )
+
+    # Reorder columns
+    df = df[['id', 'name', 'phone', 'product', 'quantity', 'price', 'profit', 'status', 'created_at']]
+
+    # Rename columns
+    df.columns = ['ID', 'Имя', 'Телефон', 'Товар', 'Количество', 'Сумма', 'Прибыль', 'Статус', 'Дата создания']
+    return df
+
+# Full statistics workbook; CPU-bound, so callers run it in a worker thread
+def build_excel_file(orders) -> io.BytesIO:
+    df = orders_frame(orders)
+
+    # Create Excel file in memory
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Sheet 1: All Orders
+        df.to_excel(writer, index=False, sheet_name='Заказы')
+        worksheet = writer.sheets['Заказы']
+        apply_styles(worksheet, "Список всех заказов")
+
+        # Sheet 2: Statistics
+        # Calculate statistics
+        total_orders = len(orders)
+        approved_orders = len(df[df["Статус"] == "approved"])
+        rejected_orders = len(df[df["Статус"] == "rejected"])
+        pending_orders = len(df[df["Статус"] == "pending"])
+        total_quantity = df["Количество"].sum()
+        total_revenue = df[df["Статус"] == "approved"]["Сумма"].sum()
+        total_profit = df[df["Статус"] == "approved"]["Прибыль"].sum()
+
+        # Create statistics DataFrame
+        stats_data = {
+            'Показатель': [
+                'Всего заказов',
+                'Одобрено',
+                'Отклонено',
+                'Ожидает',
+                'Всего товаров',
+                'Общая выручка',
+                'Общая прибыль'
+            ],
+            'Значение': [
+                total_orders,
+                approved_orders,
+                rejected_orders,
+                pending_orders,
+                total_quantity,
+                f"{total_revenue:,.0f} сум",
+                f"{total_profit:,.0f} сум"
+            ]
+        }
+
+        # Add product prices
+        prices_data = {
+            'Товар': ['Большой Гулканд', 'Средний Гулканд'],
+            'Цена': ['50,000 сум', '40,000 сум'],
+            'Себестоимость': ['25,000 сум', '20,000 сум'],
+            'Маржа': ['25,000 сум', '20,000 сум']
+        }
+
+        # Add popular products
+        product_stats = df.groupby('Товар').agg({
+            'Количество': 'sum',
+            'Сумма': 'sum',
+            'Прибыль': 'sum'
+        }).reset_index()
+        product_stats = product_stats.sort_values('Количество', ascending=False)
+
+        # Create statistics sheet
+        stats_df = pd.DataFrame(stats_data)
+        stats_df.to_excel(writer, index=False, sheet_name='Статистика', startrow=0)
+
+        # Add prices information
+        prices_df = pd.DataFrame(prices_data)
+        prices_df.to_excel(writer, index=False, sheet_name='Статистика', startrow=len(stats_data) + 3)
+
+        # Add product statistics
+        product_stats.to_excel(writer, index=False, sheet_name='Статистика', startrow=len(stats_data) + len(prices_data) + 6)
+
+        worksheet = writer.sheets['Статистика']
+        apply_styles(worksheet, "Статистика заказов")
+
+        # Add pie chart for status distribution
+        pie = PieChart()
+        pie.title = "Распределение статусов заказов"
+        pie.style = 10
+        pie.height = 10
+        pie.width = 15
+
+        data_labels = DataLabelList()
+        data_labels.showVal = True
+        data_labels.showPercent = True
+        pie.dLbls = data_labels
+
+        # Create data for pie chart
+        status_data = pd.DataFrame({
+            'Статус': ['Одобрено', 'Отклонено', 'Ожидает'],
+            'Количество': [approved_orders, rejected_orders, pending_orders]
+        })
+        status_data.to_excel(writer, index=False, sheet_name='Статистика', 
+                           startrow=len(stats_data) + len(prices_data) + len(product_stats) + 9)
+
+        data = Reference(worksheet, 
+                       min_col=2, 
+                       min_row=len(stats_data) + len(prices_data) + len(product_stats) + 10,
+                       max_row=len(stats_data) + len(prices_data) + len(product_stats) + 12,
+                       max_col=2)
+        categories = Reference(worksheet,
+                            min_col=1,
+                            min_row=len(stats_data) + len(prices_data) + len(product_stats) + 10,
+                            max_row=len(stats_data) + len(prices_data) + len(product_stats) + 12)
+
+        pie.add_data(data, titles_from_data=True)
+        pie.set_categories(categories)
+        worksheet.add_chart(pie, "E2")
+
+        # Add pie chart for product distribution
+        product_pie = PieChart()
+        product_pie.title = "Распределение продаж по товарам"
+        product_pie.style = 10
+        product_pie.height = 10
+        product_pie.width = 15
+
+        product_data_labels = DataLabelList()
+        product_data_labels.showVal = True
+        product_data_labels.showPercent = True
+        product_pie.dLbls = product_data_labels
+
+        # Create data for product pie chart
+        product_distribution = df[df['Статус'] == 'approved'].groupby('Товар')['Количество'].sum().reset_index()
+        product_distribution.to_excel(writer, index=False, sheet_name='Статистика', 
+                                    startrow=len(stats_data) + len(prices_data) + len(product_stats) + 15)
+
+        product_data = Reference(worksheet,
+                              min_col=2,
+                              min_row=len(stats_data) + len(prices_data) + len(product_stats) + 16,
+                              max_row=len(stats_data) + len(prices_data) + len(product_stats) + 17,
+                              max_col=2)
+        product_categories = Reference(worksheet,
+                                    min_col=1,
+                                    min_row=len(stats_data) + len(prices_data) + len(product_stats) + 16,
+                                    max_row=len(stats_data) + len(prices_data) + len(product_stats) + 17)
+
+        product_pie.add_data(product_data, titles_from_data=True)
+        product_pie.set_categories(product_categories)
+        worksheet.add_chart(product_pie, "E20")
+
+        # Add bar chart for popular products
+        chart = BarChart()
+        chart.title = "Популярные товары"
+        chart.y_axis.title = "Количество"
+        chart.x_axis.title = "Товар"
+
+        data = Reference(worksheet,
+                       min_col=2,
+                       min_row=len(stats_data) + len(prices_data) + 7,
+                       max_row=len(stats_data) + len(prices_data) + len(product_stats) + 6,
+                       max_col=2)
+        categories = Reference(worksheet,
+                            min_col=1,
+                            min_row=len(stats_data) + len(prices_data) + 7,
+                            max_row=len(stats_data) + len(prices_data) + len(product_stats) + 6)
+
+        chart.add_data(data, titles_from_data=True)
+        chart.set_categories(categories)
+        worksheet.add_chart(chart, "E38")
+
+    output.seek(0)
+    return output
+
+# Orders of one period menu entry as a single styled sheet
+def build_period_file(period: str, orders) -> io.BytesIO:
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        orders_frame(orders).to_excel(writer, index=False, sheet_name='Заказы', startrow=1)
+        apply_styles(writer.sheets['Заказы'], f"Заказы за период: {period}")
+    output.seek(0)
+    return output
+
+# Helper function to generate Excel file
+async def generate_excel_file(progress=None):
+    try:
+        orders = await order_store.get_orders()
+        if progress:
+            await progress(f"Формирование таблицы ({len(orders)} заказов)...")
+        return await asyncio.to_thread(build_excel_file, orders)
+    except Exception as e:
+        logger.exception(f"Error generating Excel file: {e}")
+        return None
+
+async def generate_period_file(period: str, progress=None):
+    try:
+        orders = await order_store.get_period_orders(period)
+        if not orders:
+            return None
+        if progress:
+            await progress(f"Формирование таблицы ({len(orders)} заказов)...")
+        return await asyncio.to_thread(build_period_file, period, orders)
+    except Exception as e:
+        logger.exception(f"Error generating period file: {e}")
+        return None
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import aiogram
+from aiogram.client.session.aiohttp import AiohttpSession
+from config import (
+    USE_UVLOOP, EXECUTOR_WORKERS, TELEGRAM_CONNECTION_LIMIT, TELEGRAM_DNS_CACHE_TTL, TELEGRAM_KEEPALIVE_TIMEOUT
+)
+
+try:
+    import uvloop
+except ImportError:  # Optional: the default asyncio event loop is used otherwise
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+# Runs the main coroutine on uvloop when it is installed and enabled (USE_UVLOOP)
+def run(main, use_uvloop: bool = USE_UVLOOP):
+    if use_uvloop and uvloop is not None:
+        return uvloop.run(main)
+    return asyncio.run(main)
+
+def loop_name() -> str:
+    loop = asyncio.get_running_loop()
+    if uvloop is not None and isinstance(loop, uvloop.Loop):
+        return f"uvloop {uvloop.__version__}"
+    return f"asyncio ({type(loop).__name__})"
+
+# Sizes the default executor used by asyncio.to_thread; must be called on the running loop
+def configure_executor(workers: int = EXECUTOR_WORKERS) -> ThreadPoolExecutor:
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot-worker")
+    asyncio.get_running_loop().set_default_executor(executor)
+    return executor
+
+# Bot API session with a tuned connection pool. AiohttpSession only exposes `limit`; the other TCPConnector
+# options are added to the settings aiogram builds its connector from (plain or proxy, see `proxy=`), so its
+# own create_session() is used unchanged. Fails at startup if an aiogram version no longer has them
+class TunedAiohttpSession(AiohttpSession):
+    def __init__(self, limit: int = TELEGRAM_CONNECTION_LIMIT, dns_cache_ttl: int = TELEGRAM_DNS_CACHE_TTL,
+                 keepalive_timeout: float = TELEGRAM_KEEPALIVE_TIMEOUT, **kwargs):
+        super().__init__(limit=limit, **kwargs)
+        connector_init = getattr(self, '_connector_init', None)
+        if not isinstance(connector_init, dict):
+            raise RuntimeError(f"aiogram {aiogram.__version__}: AiohttpSession has no connector settings to tune")
+        connector_init.update(ttl_dns_cache=dns_cache_ttl, keepalive_timeout=keepalive_timeout)
+        self.limit = limit
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+
+def create_session() -> TunedAiohttpSession:
+    return TunedAiohttpSession()
+
+def log_runtime(session: TunedAiohttpSession, executor: ThreadPoolExecutor):
+    logger.info(
+        f"Event loop: {loop_name()}, default executor: {executor._max_workers} threads, "
+        f"Bot API connections: limit {session.limit}, DNS cache {session.dns_cache_ttl}s, "
+        f"keep-alive {session.keepalive_timeout}s"
+    )
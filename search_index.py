@@ -0,0 +1,144 @@
+import asyncio
+import bisect
+import logging
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from order_store import order_store
+
+logger = logging.getLogger(__name__)
+
+MIN_PHONE_PREFIX = 3          # Shorter phone prefixes match too much to be useful
+COUNTRY_CODE = "998"          # Phones are also indexed without it, as admins usually dictate them
+PHONE_QUERY = re.compile(r"[\d\s()+-]+")
+APOSTROPHES = re.compile(r"[ʻʼ'`’‘]")  # o'/g' variants in Uzbek Latin names
+
+def normalize_phone(text: str) -> str:
+    return "".join(ch for ch in text if ch.isdigit())
+
+# Lowercased, accent- and apostrophe-free word tokens; customers reorder, so names repeat a lot
+@lru_cache(maxsize=65536)
+def normalize_name(text: str) -> tuple:
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return tuple(re.findall(r"\w+", APOSTROPHES.sub("", text)))
+
+class _TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = None  # Order IDs of the phone number ending at this node
+
+class PhoneTrie:
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, digits: str, order_id: int):
+        node = self.root
+        for digit in digits:
+            child = node.children.get(digit)
+            if child is None:
+                child = node.children[digit] = _TrieNode()
+            node = child
+        if node.ids is None:
+            node.ids = []
+        node.ids.append(order_id)
+
+    def search(self, prefix: str) -> set:
+        node = self.root
+        for digit in prefix:
+            node = node.children.get(digit)
+            if node is None:
+                return set()
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.ids:
+                found.update(node.ids)
+            stack.extend(node.children.values())
+        return found
+
+# In-memory /find index over the order history: phone prefixes and name tokens
+class SearchIndex:
+    def __init__(self):
+        self.phones = PhoneTrie()
+        self.tokens = defaultdict(set)  # Name token -> order IDs
+        self._sorted_tokens = []        # For prefix matches on name tokens
+        self.ids = set()
+        self.synced_at = None           # Mirror full-sync time the index was built from
+
+    def build(self, orders, synced_at=None):
+        # Build aside and swap, so incremental adds from the poller never see a half-built index
+        fresh = SearchIndex()
+        fresh.add_orders(orders)
+        self.phones, self.tokens, self._sorted_tokens, self.ids = fresh.phones, fresh.tokens, fresh._sorted_tokens, fresh.ids
+        self.synced_at = synced_at
+
+    def add_orders(self, orders):
+        for order in orders:
+            if order.id in self.ids:
+                continue
+            self.ids.add(order.id)
+            digits = normalize_phone(order.phone)
+            if digits:
+                self.phones.add(digits, order.id)
+                if digits.startswith(COUNTRY_CODE) and len(digits) > len(COUNTRY_CODE):
+                    self.phones.add(digits[len(COUNTRY_CODE):], order.id)
+            for token in normalize_name(order.name):
+                if token not in self.tokens:
+                    bisect.insort(self._sorted_tokens, token)
+                self.tokens[token].add(order.id)
+
+    def _token_ids(self, prefix: str) -> set:
+        found = set()
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            found |= self.tokens[token]
+        return found
+
+    # Order IDs matching the query, newest first
+    def search(self, query: str) -> list:
+        query = query.strip()
+        if PHONE_QUERY.fullmatch(query):
+            digits = normalize_phone(query)
+            if len(digits) < MIN_PHONE_PREFIX:
+                return []
+            found = self.phones.search(digits)
+        else:
+            found = None
+            # Every word of the query must prefix-match a word of the name
+            for token in normalize_name(query):
+                ids = self._token_ids(token)
+                found = ids if found is None else found & ids
+                if not found:
+                    break
+            found = found or set()
+        return sorted(found, reverse=True)
+
+search_index = SearchIndex()
+_build_lock = None
+
+# Builds the index from the order mirror on first use and after each full mirror sync
+async def ensure_index():
+    global _build_lock
+    if _build_lock is None:
+        _build_lock = asyncio.Lock()
+    async with _build_lock:
+        await order_store.refresh()
+        synced_at = await asyncio.to_thread(order_store.full_sync_at)
+        if search_index.synced_at is not None and search_index.synced_at == synced_at:
+            return
+        started = time.perf_counter()
+        orders = await order_store.get_orders()
+        await asyncio.to_thread(search_index.build, orders, synced_at)
+        logger.info(f"Search index built over {len(orders)} orders in {time.perf_counter() - started:.2f}s")
+
+async def search_orders(query: str) -> list:
+    await ensure_index()
+    return search_index.search(query)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import uuid
+import requests
+from backend import backend, CircuitOpenError
+from config import STATUS_UPDATE_ATTEMPTS, STATUS_UPDATE_RETRY_DELAY
+from metrics import STATUS_UPDATES
+from order_cache import update_cached_status
+from order_store import order_store
+
+logger = logging.getLogger(__name__)
+
+_in_flight = {}  # order_id -> background task applying its status change
+
+def status_change_in_flight(order_id) -> bool:
+    return str(order_id) in _in_flight
+
+# Write-through of a status to the local mirror and the lookup cache
+async def set_local_status(order_id, status: str):
+    await order_store.record_status(order_id, status)
+    update_cached_status(order_id, status)
+
+async def _patch_status(order_id: str, status: str):
+    key = uuid.uuid4().hex  # The same key on every attempt, so a retried PATCH is applied once
+    for attempt in range(1, STATUS_UPDATE_ATTEMPTS + 1):
+        try:
+            return await backend.update_status(order_id, status, idempotency_key=key)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code < 500:
+                raise  # Rejected by the backend, repeating will not help
+            error = e
+        except CircuitOpenError:
+            raise  # The backend is known to be down, do not add to its failures
+        except requests.RequestException as e:
+            error = e
+        if attempt < STATUS_UPDATE_ATTEMPTS:
+            delay = STATUS_UPDATE_RETRY_DELAY * 2 ** (attempt - 1)
+            logger.warning(f"Status update failed ({error}), attempt {attempt}/{STATUS_UPDATE_ATTEMPTS}, retry in {delay}s",
+                           extra={'order_id': order_id})
+            await asyncio.sleep(delay)
+    raise error
+
+async def _apply(order_id: str, status: str, previous: str, on_done):
+    error = None
+    try:
+        await set_local_status(order_id, status)
+        await _patch_status(order_id, status)
+        # A poll that fetched the order before the PATCH landed may have written the old status back
+        await set_local_status(order_id, status)
+        STATUS_UPDATES.inc(result="ok")
+    except Exception as e:
+        # Also local SQLite errors and unreadable responses: the chat must not stay on "processing"
+        error = e
+        STATUS_UPDATES.inc(result="failed")
+        response = e.response.text if getattr(e, 'response', None) is not None else 'No response'
+        logger.error(f"Ошибка обновления статуса: {e} - Response: {response}", extra={'order_id': order_id})
+        try:
+            await set_local_status(order_id, previous)
+        except Exception as revert_error:
+            logger.exception(f"Не удалось вернуть локальный статус заказа: {revert_error}", extra={'order_id': order_id})
+    finally:
+        _in_flight.pop(order_id, None)
+
+    try:
+        await on_done(error)
+    except Exception as e:
+        logger.exception(f"Ошибка при обновлении сообщений заказа: {e}", extra={'order_id': order_id})
+
+# Optimistic status change: the local state is updated right away and the backend PATCH runs in the
+# background; on_done(error) reconciles the chat messages once it finishes (error is None on success).
+# Returns False if a change of this order is already in flight.
+def start_status_change(order_id, status: str, on_done, previous: str = 'pending') -> bool:
+    order_id = str(order_id)
+    if order_id in _in_flight:
+        return False
+    _in_flight[order_id] = asyncio.create_task(_apply(order_id, status, previous, on_done))
+    return True
+
+# Lets in-flight PATCHes finish on shutdown
+async def drain_status_changes(timeout: float = 10):
+    if _in_flight:
+        logger.info(f"Waiting for {len(_in_flight)} status update(s) to finish")
+        await asyncio.wait(list(_in_flight.values()), timeout=timeout)